@@ -0,0 +1,263 @@
+"""
+Benchmarks of the render pipeline.
+
+Renders representative component trees against a VirtualTerminal writing to
+an in-memory stream and reports, per scenario and terminal size, the time per
+frame, the peak memory while rendering and the memory still held afterwards,
+and the bytes emitted.  Scenarios are sized to the terminal so every size
+renders real content.  Results are written as JSON so runs of different
+versions can be diffed.
+
+    python -m benchmarks.render --sizes 80x24,300x90 --repeat 20 --output bench.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from statistics import median
+from typing import Callable, Dict, List, Tuple
+
+from blessed.keyboard import Keystroke
+
+from greenscreen.application import Application
+from greenscreen.components.base import Component
+from greenscreen.components.layout import HorizontalLayout, VerticalLayout, Layout
+from greenscreen.components.text import Text
+from greenscreen.display.border import Borders
+from greenscreen.display.buffer import FrameBuffer
+from greenscreen.display.sizing import Sizing
+from greenscreen.display.text import Line, Fragment, Colors, Capabilities
+from greenscreen.screen import SimpleScreen
+from greenscreen.terminal import VirtualTerminal
+
+WORDS = 'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor'.split()
+COLORS = [Colors.RED, Colors.GREEN, Colors.YELLOW, Colors.BLUE, Colors.MAGENTA, Colors.CYAN]
+CAPABILITIES = [Capabilities.BOLD, Capabilities.UNDERLINE, Capabilities.REVERSE]
+
+RIGHT = Keystroke('\x1b[C', name='KEY_RIGHT')
+LEFT = Keystroke('\x1b[D', name='KEY_LEFT')
+
+
+def sentence(count: int, seed: int=0) -> str:
+    return ' '.join(WORDS[(seed + idx * 7) % len(WORDS)] for idx in range(count))
+
+
+def nested(depth: int=8) -> Component:
+    component: Component = Text(sentence(12))
+    for level in range(depth):
+        layout = HorizontalLayout if level % 2 else VerticalLayout
+        component = layout([component, Text(sentence(6, level))], weights=[3, 1])
+    return component
+
+
+def nesting(width: int, height: int, deepest: int=8) -> int:
+    """
+    Depth of the deepest nested() tree whose texts all get at least a cell
+    at the size.  Every level draws a focus ring around both children and
+    gives the nested one three quarters of its width or height.
+    """
+    for depth in range(deepest, 1, -1):
+        inner_width, inner_height = width, height
+        smallest = min(width, height)
+
+        for level in reversed(range(depth)):
+            if level % 2:
+                side = inner_width - inner_width * 3 // 4
+                smallest = min(smallest, side - 2, inner_height - 2)
+                inner_width, inner_height = inner_width - side - 2, inner_height - 2
+            else:
+                side = inner_height - inner_height * 3 // 4
+                smallest = min(smallest, inner_width - 2, side - 2)
+                inner_width, inner_height = inner_width - 2, inner_height - side - 2
+
+        if min(smallest, inner_width, inner_height) >= 1:
+            return depth
+    return 1
+
+
+def grid(rows: int=6, columns: int=6) -> Component:
+    return VerticalLayout([
+        HorizontalLayout([
+            Text('{}x{} {}'.format(row, column, sentence(4, row * columns + column)))
+            for column in range(columns)
+        ])
+        for row in range(rows)
+    ])
+
+
+def long_text(words: int=5000) -> Component:
+    return Text(sentence(words), border=Borders.LIGHT, padding=Sizing(1, 1, 1, 1))
+
+
+def styled(fragments: int=2000) -> Component:
+    text = Text('')
+    text.value = Line(*[
+        Fragment(
+            WORDS[idx % len(WORDS)] + ' ',
+            foreground=COLORS[idx % len(COLORS)],
+            background=COLORS[(idx // 3) % len(COLORS)] if idx % 5 == 0 else None,
+            capabilities={CAPABILITIES[idx % len(CAPABILITIES)]} if idx % 4 == 0 else None,
+        )
+        for idx in range(fragments)
+    ])
+    return text
+
+
+# Scenarios are built for the width and height they are rendered at
+SCENARIOS: Dict[str, Callable[[int, int], Component]] = {
+    'nested': lambda width, height: nested(nesting(width, height)),
+    'grid': lambda width, height: grid(max(1, min(6, height // 5)), max(1, min(6, width // 20))),
+    'long_text': lambda width, height: long_text(),
+    'styled': lambda width, height: styled(),
+}
+
+
+def leaf(component: Component) -> Text:
+    while not isinstance(component, Text):
+        component = component.children[0]
+    return component
+
+
+def edit(text: Text):
+    """
+    Swaps the case of the first word of the text, a small change to draw.
+    """
+    first = text.value.fragments[0]
+    word, space, rest = first.text.partition(' ')
+    changed = Fragment.styled(word.swapcase() + space + rest, first.style)
+    text.value = Line.of([changed] + text.value.fragments[1:])
+
+
+def timed(func: Callable, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    return {
+        'min_ms': min(samples) * 1000,
+        'median_ms': median(samples) * 1000,
+        'mean_ms': sum(samples) / len(samples) * 1000,
+    }
+
+
+def allocated(func: Callable) -> Dict[str, int]:
+    """
+    Peak memory while calling func and memory it still holds afterwards,
+    like caches, both over what was in use before the call.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'retained_bytes': retained, 'peak_bytes': peak}
+
+
+def scenario(name: str, size: Tuple[int, int], repeat: int) -> Dict:
+    width, height = size
+    terminal = VirtualTerminal(width, height)
+
+    app = Application(terminal=terminal)
+    screen = SimpleScreen(name, app, SCENARIOS[name](width, height - 1))
+    app.active = name
+
+    def cold():
+        screen.root = SCENARIOS[name](width, height - 1)
+        return screen.render(terminal)
+
+    def warm():
+        return screen.render(terminal)
+
+    def changed():
+        screen.root.invalidate()
+        return screen.render(terminal)
+
+    buffer = FrameBuffer()
+    frames = [0]
+
+    def diff():
+        # Every frame moves the focus in layouts and edits a text
+        app.handle_keypress(LEFT if frames[0] % 2 else RIGHT)
+        edit(leaf(screen.root))
+        frames[0] += 1
+        return buffer.draw(terminal, screen.frame(width, height - 1), width, height - 1)
+
+    output = cold()
+    full = buffer.draw(terminal, screen.frame(width, height - 1), width, height - 1)
+    result = {
+        'scenario': name,
+        'width': width,
+        'height': height,
+        'bytes': {
+            'render': len(output.encode('utf-8')),
+            'buffer_full': len(full.encode('utf-8')),
+            'buffer_diff': len(diff().encode('utf-8')),
+        },
+        'cold': dict(timed(cold, repeat), **allocated(cold)),
+        'warm': dict(timed(warm, repeat), **allocated(warm)),
+        'invalidated': dict(timed(changed, repeat), **allocated(changed)),
+        'diff': dict(timed(diff, repeat), **allocated(diff)),
+    }
+
+    app.executor.shutdown(wait=False)
+    return result
+
+
+def micro(repeat: int) -> List[Dict]:
+    terminal = VirtualTerminal()
+    line = styled(200).value
+    text = Line(sentence(400))
+    weights = [100, 300, 600]
+
+    cases = {
+        'line_fit': lambda: line.fit(500),
+        'line_wrap': lambda: text.wrap(80),
+        'line_escape': lambda: line.escape(terminal),
+        'layout_weighted': lambda: [Layout.weighted(amount, weights) for amount in range(80, 300)],
+    }
+
+    return [dict(case=name, **timed(func, repeat), **allocated(func)) for name, func in cases.items()]
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def main(argv: List[str]=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='80x24,120x40,300x90')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--output', default='-')
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'scenarios': [
+            scenario(name, size, args.repeat)
+            for name in args.scenarios.split(',')
+            for size in sizes
+        ],
+        'micro': micro(args.repeat),
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output == '-':
+        sys.stdout.write(text + '\n')
+    else:
+        with open(args.output, 'w') as output:
+            output.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
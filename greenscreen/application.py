@@ -1,20 +1,58 @@
+import asyncio
+import logging
+import os
 import signal
+import sys
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from inspect import isasyncgenfunction, iscoroutinefunction
+from time import perf_counter
+from typing import Dict, Set, Deque, Tuple, Optional, List
 
 from blessed import Terminal
-from blessed.keyboard import Keystroke
+from blessed.keyboard import Keystroke, resolve_sequence
 
-from greenscreen.input import Result, Unhandled, Continue
+from greenscreen.components.base import Component
+from greenscreen.display.buffer import FrameBuffer, BEGIN_SYNC, END_SYNC
+from greenscreen.input import Result, Unhandled, Continue, Async, Repaint, Bindable, binds
+from greenscreen.input import Paste, BRACKETED_PASTE_ON, BRACKETED_PASTE_OFF, PASTE_BEGIN, PASTE_END
+from greenscreen.profiler import Profiler
 from greenscreen.screen import Screen
 from greenscreen.exceptions import DuplicateRegistration, NoActiveScreen
 
+logger = logging.getLogger(__name__)
 
-class Application(object):
-    def __init__(self):
+
+class Application(Bindable):
+    def __init__(self, executor: Executor=None, terminal: Terminal=None):
+        self.bindings = {}
         self.screens = {}
         self.active = None
         self.repaint = True
-        self.terminal = Terminal()
+        self.terminal = terminal or Terminal()
+        self.buffer = FrameBuffer()
         self.timeout = 0.5
+        self.esc_delay = 0.35
+        self.poll = 0.05
+        self.latency = 0.05
+        self.backlog = False
+        self.pasted: Optional[List[str]] = None
+        self.partial = ''
+        self.held = 0.0
+        self.typed = ''
+        self.max_fps = 60
+        self.synchronized = True
+        self.painted = 0.0
+        self.executor = executor or ThreadPoolExecutor(max_workers=4)
+        self.threads: Optional[ThreadPoolExecutor] = None
+        self.jobs: Dict[str, Set[Async]] = defaultdict(set)
+        self.completed: Deque[Tuple[str, Async, Future]] = deque()
+        self.profiler: Optional[Profiler] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.tick: Optional[asyncio.TimerHandle] = None
+        self.expiry: Optional[asyncio.TimerHandle] = None
 
     @property
     def active_screen(self) -> Screen:
@@ -34,12 +72,114 @@ class Application(object):
     def clear_screen(self, key: str):
         self.screens.pop(key, None)
 
+        for job in self.jobs.pop(key, ()):
+            job.future.cancel()
+
+    @property
+    def pending(self) -> bool:
+        return any(self.jobs.values())
+
+    def submit(self, job: Async):
+        """
+        Runs the work of an Async result.  The job is tracked against the
+        active screen and its value delivered back to its source by
+        async_update() once it completes.
+
+        An exception raised by the work is delivered to the source's
+        handle_error() instead, and logged if that leaves it unhandled.
+
+        Plain functions run on the executor; with a process pool the function
+        and its arguments must be picklable.  Coroutine functions run as a
+        task under run_async(), or on a thread pool of their own otherwise,
+        as coroutines can't be sent to a process pool.  Async generator
+        functions run the same way and deliver every value they yield.
+        """
+        key = self.active
+
+        if isasyncgenfunction(job.func):
+            coroutine = self.iterate(key, job)
+        elif iscoroutinefunction(job.func):
+            coroutine = job.func(*job.args, **job.kwargs)
+        else:
+            coroutine = None
+
+        if coroutine is None:
+            job.future = self.executor.submit(job.func, *job.args, **job.kwargs)
+        elif self.loop is not None:
+            job.future = self.loop.create_task(coroutine)
+        else:
+            if self.threads is None:
+                self.threads = ThreadPoolExecutor(max_workers=4)
+            job.future = self.threads.submit(asyncio.run, coroutine)
+
+        self.jobs[key].add(job)
+        job.future.add_done_callback(lambda future: self.complete(key, job, future))
+
+    async def iterate(self, key: str, job: Async):
+        async for value in job.func(*job.args, **job.kwargs):
+            future = Future()
+            future.set_result(value)
+            self.complete(key, job, future)
+
+    def complete(self, key: str, job: Async, future: Future):
+        self.completed.append((key, job, future))
+        self.wake()
+
+    def async_update(self) -> bool:
+        repaint = False
+
+        while self.completed:
+            key, job, future = self.completed.popleft()
+
+            if future is job.future:
+                self.jobs[key].discard(job)
+
+            if future.cancelled():
+                continue
+
+            error = future.exception()
+            if error is not None:
+                # A failing job is reported to its source, not to the loop
+                result = job.source.handle_error(job, error)
+                if not result.handled:
+                    logger.error('Unhandled error in %r', job.func, exc_info=error)
+            elif future is job.future and isasyncgenfunction(job.func):
+                continue
+            else:
+                result = job.source.handle_async(job, future.result())
+
+            repaint = repaint or (result.repaint and key == self.active)
+
+        return repaint
+
+    def cancel(self):
+        for jobs in self.jobs.values():
+            for job in jobs:
+                job.future.cancel()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        if self.threads is not None:
+            self.threads.shutdown(wait=False)
+
     def register_signal_handler(self):
         signal.signal(signal.SIGWINCH, self.on_resize)
 
     def on_resize(self, sig, action):
         self.repaint = True
 
+    def wake(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def next_frame(self):
+        self.tick = None
+        self.wakeup.set()
+
+    def request_repaint(self):
+        self.repaint = True
+        self.wake()
+
     def handle_keypress(self, key: Keystroke) -> Result:
         result = self.keypress(key)
         if result.handled:
@@ -58,21 +198,322 @@ class Application(object):
         return self.active_screen.handle_keypress(key)
 
     def after_keypress(self, key: Keystroke) -> Result:
-        if key == 'q':
-            self.active = False
+        handler = self.binding(key)
+        return handler(key) if handler is not None else Continue(self)
+
+    @binds('q')
+    def quit(self, key: Keystroke) -> Result:
+        self.active = False
         return Continue(self)
 
+    def handle_async(self, job: Async, value) -> Result:
+        return Repaint(self)
+
+    def handle_error(self, job: Async, error: BaseException) -> Result:
+        return Unhandled()
+
+    def handle_result(self, result: Result):
+        if isinstance(result, Async):
+            self.submit(result)
+
+        self.repaint = self.repaint or result.repaint
+
+    def profile(self, profiler: Optional[Profiler]):
+        """
+        Installs a Profiler on all components, or removes it when given None.
+        """
+        self.profiler = profiler
+        Component.profiler = profiler
+        self.repaint = True
+
+    def paint(self):
+        width = self.terminal.width
+        height = self.terminal.height - 1
+
+        if self.active_screen.legacy:
+            self.buffer.invalidate()
+            self.write(str(self.terminal.clear) + self.active_screen.render(self.terminal))
+            self.painted = perf_counter()
+            return
+
+        if self.profiler is None:
+            lines = self.active_screen.frame(width, height)
+        else:
+            self.profiler.begin_frame()
+            lines = self.active_screen.frame(width, height)
+            self.profiler.end_frame()
+
+            if self.profiler.overlay:
+                lines = self.profiler.draw(lines, width)
+
+        self.write(self.buffer.draw(self.terminal, lines, width, height))
+        self.painted = perf_counter()
+
+    def frame_delay(self) -> float:
+        """
+        Seconds until the next frame may be painted under max_fps.
+        """
+        if not self.max_fps:
+            return 0.0
+        return max(0.0, self.painted + 1 / self.max_fps - perf_counter())
+
+    def write(self, frame: str):
+        """
+        Writes a whole frame at once, in a single write to the file
+        descriptor of the terminal's stream when it has one, so the terminal
+        never shows a partially drawn frame.
+        """
+        if not frame:
+            return
+
+        if self.synchronized:
+            frame = BEGIN_SYNC + frame + END_SYNC
+
+        stream = self.terminal.stream
+        try:
+            fd = stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            stream.write(frame)
+            stream.flush()
+            return
+
+        data = frame.encode(getattr(stream, 'encoding', None) or 'utf-8', 'replace')
+        stream.flush()
+        while data:
+            data = data[os.write(fd, data):]
+
+    def decode(self, text: str) -> Keystroke:
+        return resolve_sequence(text, self.terminal._keymap, self.terminal._keycodes)
+
+    def drain(self):
+        """
+        Handles all keys received and not handled yet before painting, so a
+        burst of keys, like a held arrow key, costs one frame.  After
+        `latency` seconds the frame is painted and the rest of the burst is
+        handled afterwards.
+        """
+        deadline = perf_counter() + self.latency
+
+        while self.typed and self.active:
+            key = self.decode(self.typed)
+            self.typed = self.typed[len(key):]
+            self.handle_result(self.handle_keypress(key))
+
+            if self.typed and perf_counter() >= deadline:
+                self.backlog = True
+                break
+
+        self.wake()
+
+    def read(self, timeout: Optional[float]) -> str:
+        """
+        Waits up to timeout for input on the terminal's keyboard and returns
+        all of it that is available, undecoded into keys.
+        """
+        text = ''
+        if self.terminal.kbhit(timeout=timeout):
+            while self.terminal.kbhit(timeout=0):
+                text += self.terminal.getch()
+        return text
+
+    def hold(self, text: str) -> str:
+        """
+        Keeps back the end of the text when it may be the start of a key
+        sequence or paste marker split over two reads, and returns the rest.
+        What is kept is handled by flush() if nothing completes it within
+        `esc_delay` seconds, like a single press of escape.
+        """
+        start = text.rfind('\x1b')
+        if start == -1:
+            return text
+
+        tail = text[start:]
+        if tail not in self.terminal._keymap_prefixes and not PASTE_BEGIN.startswith(tail):
+            return text
+
+        self.partial = tail
+        self.held = perf_counter()
+        if self.loop is not None:
+            self.expiry = self.loop.call_later(self.esc_delay, self.flush)
+        return text[:start]
+
+    def flush(self):
+        self.expiry = None
+        if self.partial and self.pasted is None:
+            self.typed += self.partial
+            self.partial = ''
+            self.drain()
+
+    def receive(self, text: str):
+        """
+        Handles raw input.  Keys are decoded and handled as they are, text
+        pasted in bracketed paste mode is collected and handled once as a
+        Paste.  Key sequences, paste markers and pasted text may be split
+        over any number of calls.  Called without text, it handles what is
+        left of a burst of keys.
+        """
+        if self.expiry is not None:
+            self.expiry.cancel()
+            self.expiry = None
+
+        text = self.partial + text
+        self.partial = ''
+
+        while self.active:
+            if self.pasted is None:
+                start = text.find(PASTE_BEGIN)
+                if start == -1:
+                    self.typed += self.hold(text)
+                    self.drain()
+                    break
+
+                self.typed += text[:start]
+                text = text[start + len(PASTE_BEGIN):]
+
+                # Keys typed before the paste are handled before it
+                self.drain()
+                while self.backlog and self.active:
+                    self.backlog = False
+                    self.drain()
+                self.pasted = []
+                continue
+
+            end = text.find(PASTE_END)
+            if end == -1:
+                # Keep the start of an end marker split over two reads
+                for size in range(len(PASTE_END) - 1, 0, -1):
+                    if text.endswith(PASTE_END[:size]):
+                        self.partial = text[-size:]
+                        text = text[:-size]
+                        break
+
+                self.pasted.append(text)
+                break
+
+            self.pasted.append(text[:end])
+            text = text[end + len(PASTE_END):]
+            paste = Paste(''.join(self.pasted))
+            self.pasted = None
+            self.handle_result(self.handle_keypress(paste))
+            self.wake()
+
+    def feed(self, text: str):
+        """
+        Handles input received from somewhere else than the terminal's own
+        keyboard, like a network connection.
+        """
+        self.receive(text)
+
+    def on_input(self):
+        self.receive(self.read(0))
+
+    @contextmanager
+    def bracketed_paste(self):
+        self.terminal.stream.write(BRACKETED_PASTE_ON)
+        self.terminal.stream.flush()
+        try:
+            yield
+        finally:
+            self.terminal.stream.write(BRACKETED_PASTE_OFF)
+            self.terminal.stream.flush()
+
     def run(self):
         self.register_signal_handler()
+        self.buffer.invalidate()
+
+        with self.terminal.fullscreen(), self.terminal.cbreak(), self.terminal.hidden_cursor(), \
+                self.bracketed_paste():
+            while self.active:
+                if self.async_update():
+                    self.repaint = True
+
+                timeout = self.poll if self.pending else self.timeout
+                if self.repaint:
+                    delay = self.frame_delay()
+                    if delay > 0:
+                        # Coalesce into the next frame tick
+                        timeout = min(timeout, delay)
+                    else:
+                        self.paint()
+                        self.repaint = False
+
+                if self.backlog:
+                    self.backlog = False
+                    timeout = 0
+                elif self.partial and self.pasted is None:
+                    timeout = min(timeout, max(0.0, self.held + self.esc_delay - perf_counter()))
+
+                text = self.read(timeout)
+                if text or self.typed:
+                    self.receive(text)
+                elif self.partial and perf_counter() >= self.held + self.esc_delay:
+                    self.flush()
 
-        with self.terminal.fullscreen(), self.terminal.cbreak():
+        self.cancel()
+        self.shutdown()
+
+    async def run_async(self):
+        """
+        Runs the application on the running asyncio event loop, reading the
+        keyboard of the process.
+        """
+        loop = asyncio.get_running_loop()
+        keyboard = sys.__stdin__.fileno()
+
+        with self.terminal.fullscreen(), self.terminal.cbreak(), self.terminal.hidden_cursor(), \
+                self.bracketed_paste():
+            loop.add_reader(keyboard, self.on_input)
+            loop.add_signal_handler(signal.SIGWINCH, self.request_repaint)
+
+            try:
+                await self.main_loop()
+            finally:
+                loop.remove_reader(keyboard)
+                loop.remove_signal_handler(signal.SIGWINCH)
+
+        self.shutdown()
+
+    async def main_loop(self):
+        """
+        Paints and delivers completed jobs until the application quits.  The
+        loop only wakes up for input, a resize, a completed job or a repaint
+        request, so an idle application costs no CPU.  Input has to be
+        delivered with receive() or feed().
+        """
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.buffer.invalidate()
+
+        try:
             while self.active:
+                self.wakeup.clear()
+
+                if self.async_update():
+                    self.repaint = True
+
                 if self.repaint:
-                    print(self.terminal.clear)
-                    print(self.active_screen.render(self.terminal))
-                    self.repaint = False
-
-                key = self.terminal.inkey(timeout=self.timeout)
-                if key:
-                    result = self.handle_keypress(key)
-                    self.repaint = result.repaint
+                    delay = self.frame_delay()
+                    if delay > 0:
+                        # Coalesce into the next frame tick
+                        if self.tick is None:
+                            self.tick = self.loop.call_later(delay, self.next_frame)
+                    else:
+                        self.paint()
+                        self.repaint = False
+
+                if self.backlog:
+                    # Keys left from a burst don't wake the reader
+                    self.backlog = False
+                    self.loop.call_soon(self.drain)
+
+                if self.active:
+                    await self.wakeup.wait()
+        finally:
+            if self.tick is not None:
+                self.tick.cancel()
+                self.tick = None
+            if self.expiry is not None:
+                self.expiry.cancel()
+                self.expiry = None
+            self.cancel()
+            self.loop = None
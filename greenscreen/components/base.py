@@ -1,4 +1,4 @@
-from typing import List, Set
+from typing import List, Set, Optional, Tuple, Callable, Dict
 
 from blessed.keyboard import Keystroke
 
@@ -6,10 +6,101 @@ from greenscreen.exceptions import InvalidContent
 from greenscreen.display.border import Borders, Border
 from greenscreen.display.sizing import Sizing
 from greenscreen.display.text import Line, Fragment, Color, Capability
-from greenscreen.input import Result, Unhandled
+from greenscreen.input import Result, Unhandled, Async, Repaint, Bindable
 
 
-class Component(object):
+class BoxPlan(object):
+    """
+    The box model of a component compiled for one size: the rows above and
+    below the content, the prefix and suffix of every content row and the
+    size left for the content.
+    """
+
+    def __init__(self, component: 'Component', width: int, height: int):
+        margin, border, padding = component.margin, component.border, component.padding
+
+        reserved_width = sum([
+            margin.left,
+            border.left_width,
+            padding.left,
+            padding.right,
+            border.right_width,
+            margin.right,
+        ])
+
+        reserved_height = sum([
+            margin.top,
+            border.top_height,
+            padding.top,
+            padding.bottom,
+            border.bottom_height,
+            margin.bottom,
+        ])
+
+        self.inner_width = width - reserved_width
+        self.inner_height = height - reserved_height
+        self.placeholder: Optional[List[Line]] = None
+
+        if self.inner_width < 1 or self.inner_height < 1:
+            self.placeholder = [Line('.' * width) for _ in range(height)]
+            return
+
+        self.top = (
+            component.render_vertical_margin(width, margin.top) +
+            component.render_border_top(width) +
+            component.render_vertical_padding(width, padding.top)
+        )
+
+        self.bottom = (
+            component.render_vertical_padding(width, padding.bottom) +
+            component.render_border_bottom(width) +
+            component.render_vertical_margin(width, margin.bottom)
+        )
+
+        prefix = ''.join([' ' * margin.left, border.left_border(), ' ' * padding.left])
+        suffix = ''.join([' ' * padding.right, border.right_border(), ' ' * margin.right])
+        self.prefix = [component.fragment(prefix)] if prefix else []
+        self.suffix = [component.fragment(suffix)] if suffix else []
+
+    def wrap(self, line: Line) -> Line:
+        return Line.of(self.prefix + line.fragments + self.suffix)
+
+
+class Component(Bindable):
+    """
+    Base of all renderable components.
+
+    Rendered lines are memoized per (width, height, version).  Assigning a
+    different value to any attribute listed in `tracked` bumps the version
+    and marks the component and its ancestors dirty, so unchanged subtrees
+    are served from the cache on the next render.  In-place mutation of a
+    tracked value (adding to `capabilities`, calling `Sizing.vertical`) is
+    not detected, call invalidate() afterwards, or restyle() for the
+    attributes of the box model.
+
+    The box model is compiled into a BoxPlan per size, kept until one of
+    the `styled` attributes changes.  Content lines are checked against the
+    size of the content area unless `validate` is turned off, per component
+    or for all of them on the class, once the components are trusted.
+
+    Keypresses are dispatched to the `focused` child and then looked up in
+    the key bindings, see Bindable.  Components that change which child is
+    focused call refocus() so screens recompile their key maps.
+    """
+    profiler = None
+    validate = True
+
+    styled: Tuple[str, ...] = (
+        'border',
+        'padding',
+        'margin',
+        'foreground',
+        'background',
+        'capabilities',
+    )
+
+    tracked: Tuple[str, ...] = styled
+
     def __init__(self,
                  border: Border=Borders.NONE,
                  padding: Sizing=None,
@@ -17,6 +108,13 @@ class Component(object):
                  foreground: Color=None,
                  background: Color=None,
                  capabilities: Set[Capability]=None):
+        self.parent: Optional[Component] = None
+        self.bindings = {}
+        self.focus_version = 0
+        self.version = 0
+        self.dirty = True
+        self.rendered: Optional[Tuple[Tuple[int, int, int], List[Line]]] = None
+        self.plans: Dict[Tuple[int, int], BoxPlan] = {}
         self.border = border
         self.padding = padding or Sizing()
         self.margin = margin or Sizing()
@@ -24,6 +122,57 @@ class Component(object):
         self.background = background
         self.capabilities = capabilities or set()
 
+    def __setattr__(self, name, value):
+        changed = name in self.tracked and self.__dict__.get(name, value) != value
+        super().__setattr__(name, value)
+        if changed:
+            if name in self.styled:
+                self.plans = {}
+            self.invalidate()
+
+    def invalidate(self):
+        self.version += 1
+        if self.dirty:
+            return
+
+        self.dirty = True
+        if self.parent is not None:
+            self.parent.invalidate()
+
+    def restyle(self):
+        self.plans = {}
+        self.invalidate()
+
+    def adopt(self, child: 'Component') -> 'Component':
+        child.parent = self
+        self.invalidate()
+        self.refocus()
+        return child
+
+    def refocus(self):
+        self.focus_version += 1
+        if self.parent is not None:
+            self.parent.refocus()
+
+    @property
+    def focused(self) -> Optional['Component']:
+        return None
+
+    @classmethod
+    def compilable(cls) -> bool:
+        """
+        Whether keypresses for this class are fully described by its key
+        bindings, so they can be dispatched from a compiled key map.
+        """
+        return all(
+            getattr(cls, name) is getattr(Component, name)
+            for name in ('handle_keypress', 'keypress', 'dispatch_keypress', 'after_keypress')
+        )
+
+    def bind(self, key: str, handler: Callable[[Keystroke], Result]):
+        super().bind(key, handler)
+        self.refocus()
+
     def line(self, value: str) -> Line:
         return Line(self.fragment(value))
 
@@ -35,39 +184,37 @@ class Component(object):
             capabilities=self.capabilities
         )
 
+    def profiled(self, phase: str, func: Callable[..., List[Line]], *args) -> List[Line]:
+        if Component.profiler is None:
+            return func(*args)
+        return Component.profiler.measure(self, phase, func, *args)
+
     def render(self, width: int, height: int) -> List[Line]:
-        min_width = sum([
-            self.margin.left,
-            self.border.left_width,
-            self.padding.left,
-            1,
-            self.padding.right,
-            self.border.right_width,
-            self.margin.right
-        ])
+        return self.profiled('render', self.render_cached, width, height)
 
-        min_height = sum([
-            self.margin.top,
-            self.border.top_height,
-            self.padding.top,
-            1,
-            self.padding.bottom,
-            self.border.bottom_height,
-            self.margin.bottom,
-        ])
+    def render_cached(self, width: int, height: int) -> List[Line]:
+        key = (width, height, self.version)
+        if self.rendered is None or self.rendered[0] != key:
+            self.rendered = (key, self.render_box(width, height))
+            self.dirty = False
 
-        if width < min_width or height < min_height:
-            return [Line('.' * width) for _ in range(height)]
-
-        return (
-            self.render_vertical_margin(width, self.margin.top) +
-            self.render_border_top(width) +
-            self.render_vertical_padding(width, self.padding.top) +
-            self.render_content(width, height) +
-            self.render_vertical_padding(width, self.padding.bottom) +
-            self.render_border_bottom(width) +
-            self.render_vertical_margin(width, self.margin.bottom)
-        )
+        return list(self.rendered[1])
+
+    def plan(self, width: int, height: int) -> BoxPlan:
+        key = (width, height)
+        plan = self.plans.get(key)
+        if plan is None:
+            if len(self.plans) >= 8:
+                self.plans = {}
+            plan = self.plans[key] = BoxPlan(self, width, height)
+        return plan
+
+    def render_box(self, width: int, height: int) -> List[Line]:
+        plan = self.plan(width, height)
+        if plan.placeholder is not None:
+            return list(plan.placeholder)
+
+        return plan.top + self.render_content(width, height) + plan.bottom
 
     def render_vertical_margin(self, width: int, height: int) -> List[Line]:
         return [self.line(' ' * width) for _ in range(height)]
@@ -105,41 +252,11 @@ class Component(object):
         return [self.line(line) for _ in range(height)]
 
     def render_content(self, width: int, height: int) -> List[Line]:
-        reserved_width = sum([
-            self.margin.left,
-            self.border.left_width,
-            self.padding.left,
-            self.padding.right,
-            self.border.right_width,
-            self.margin.right,
-        ])
-
-        reserved_height = sum([
-            self.margin.top,
-            self.border.top_height,
-            self.padding.top,
-            self.padding.bottom,
-            self.border.bottom_height,
-            self.margin.bottom
-        ])
-
-        inner_width = width - reserved_width
-        inner_height = height - reserved_height
+        plan = self.plan(width, height)
+        inner_width = plan.inner_width
+        inner_height = plan.inner_height
 
-        prefix = self.fragment(''.join([
-            ' ' * self.margin.left,
-            self.border.left_border(),
-            ' ' * self.padding.left,
-        ]))
-
-        suffix = self.fragment(''.join([
-            ' ' * self.padding.right,
-            self.border.right_border(),
-            ' ' * self.margin.right,
-        ]))
-
-        result = []
-        content = self.content(inner_width, inner_height)
+        content = self.profiled('content', self.content, inner_width, inner_height)
         if len(content) != inner_height:
             raise InvalidContent('{}: Expected content height {}, actual height {}'.format(
                 self.__class__.__name__,
@@ -147,25 +264,21 @@ class Component(object):
                 len(content)
             ))
 
-        invalid_lines = [
-            (idx, len(line), str(line))
-            for idx, line in enumerate(content)
-            if len(line) != inner_width
-        ]
+        if self.validate:
+            invalid_lines = [
+                (idx, len(line), str(line))
+                for idx, line in enumerate(content)
+                if len(line) != inner_width
+            ]
 
-        if invalid_lines:
-            raise InvalidContent('{}: Expected content width {}, lines with widths {}'.format(
-                self.__class__.__name__,
-                inner_width,
-                invalid_lines
-            ))
-
-        for line in content:
-            line.fragments.insert(0, prefix)
-            line.fragments.append(suffix)
-            result.append(line)
+            if invalid_lines:
+                raise InvalidContent('{}: Expected content width {}, lines with widths {}'.format(
+                    self.__class__.__name__,
+                    inner_width,
+                    invalid_lines
+                ))
 
-        return result
+        return [plan.wrap(line) for line in content]
 
     def render_border_bottom(self, width: int) -> List[Line]:
         if not self.border.has_bottom:
@@ -198,7 +311,15 @@ class Component(object):
         return Unhandled()
 
     def dispatch_keypress(self, key: Keystroke) -> Result:
-        return Unhandled()
+        focused = self.focused
+        return focused.handle_keypress(key) if focused is not None else Unhandled()
 
     def after_keypress(self, key: Keystroke) -> Result:
+        handler = self.binding(key)
+        return handler(key) if handler is not None else Unhandled()
+
+    def handle_async(self, job: Async, value) -> Result:
+        return Repaint(self)
+
+    def handle_error(self, job: Async, error: BaseException) -> Result:
         return Unhandled()
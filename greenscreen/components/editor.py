@@ -0,0 +1,455 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Set, Dict, Optional, Tuple
+
+from blessed.keyboard import Keystroke
+
+from greenscreen.components.base import Component
+from greenscreen.display.border import Borders, Border
+from greenscreen.display.sizing import Sizing
+from greenscreen.display.text import Line, Fragment, Color, Capability, Capabilities, char_width, text_width
+from greenscreen.display.text import wrap_offsets
+from greenscreen.input import Result, Unhandled, Repaint, binds
+
+Row = Tuple[int, int]
+
+
+def newlines(text: str, offset: int=0) -> List[int]:
+    result = []
+    idx = text.find('\n')
+    while idx != -1:
+        result.append(offset + idx)
+        idx = text.find('\n', idx + 1)
+    return result
+
+
+class GapBuffer(object):
+    """
+    Text with a gap at the edit position, so inserting and deleting there
+    costs the size of the edit.  Moving the gap costs the distance moved.
+
+    The positions of newlines are kept in two lists split at the gap, those
+    before it as positions from the start and those after it as distances
+    from the end, neither of which an edit at the gap changes.  Both lists
+    are ordered so the newlines nearest the gap are at their ends.
+    """
+
+    def __init__(self, text: str='', capacity: int=64):
+        self.chars = array('u', ' ' * (len(text) + capacity))
+        self.chars[:len(text)] = array('u', text)
+        self.gap_start = len(text)
+        self.gap_end = len(self.chars)
+        self.before: List[int] = newlines(text)
+        self.after: List[int] = []
+
+    def __len__(self):
+        return len(self.chars) - (self.gap_end - self.gap_start)
+
+    def move(self, position: int):
+        length = len(self)
+
+        if position < self.gap_start:
+            count = self.gap_start - position
+            self.chars[self.gap_end - count:self.gap_end] = self.chars[position:self.gap_start]
+            self.gap_start -= count
+            self.gap_end -= count
+            while self.before and self.before[-1] >= position:
+                self.after.append(length - self.before.pop())
+
+        elif position > self.gap_start:
+            count = position - self.gap_start
+            self.chars[self.gap_start:position] = self.chars[self.gap_end:self.gap_end + count]
+            self.gap_start += count
+            self.gap_end += count
+            while self.after and length - self.after[-1] < position:
+                self.before.append(length - self.after.pop())
+
+    def insert(self, position: int, text: str):
+        self.move(position)
+
+        if len(text) > self.gap_end - self.gap_start:
+            grow = len(text) + len(self.chars)
+            self.chars = self.chars[:self.gap_start] + array('u', ' ' * grow) + self.chars[self.gap_end:]
+            self.gap_end = self.gap_start + grow
+
+        self.chars[self.gap_start:self.gap_start + len(text)] = array('u', text)
+        self.before.extend(newlines(text, position))
+        self.gap_start += len(text)
+
+    def delete(self, position: int, count: int) -> str:
+        self.move(position)
+        removed = self.chars[self.gap_end:self.gap_end + count].tounicode()
+        length = len(self)
+
+        while self.after and length - self.after[-1] < position + len(removed):
+            self.after.pop()
+
+        self.gap_end += len(removed)
+        return removed
+
+    def text(self, start: int=0, end: Optional[int]=None) -> str:
+        end = len(self) if end is None else end
+        if end <= self.gap_start:
+            return self.chars[start:end].tounicode()
+
+        offset = self.gap_end - self.gap_start
+        if start >= self.gap_start:
+            return self.chars[start + offset:end + offset].tounicode()
+
+        return self.chars[start:self.gap_start].tounicode() + self.chars[self.gap_end:end + offset].tounicode()
+
+    @property
+    def paragraphs(self) -> int:
+        return len(self.before) + len(self.after) + 1
+
+    def newline(self, index: int) -> int:
+        if index < len(self.before):
+            return self.before[index]
+        return len(self) - self.after[len(self.before) + len(self.after) - 1 - index]
+
+    def paragraph_of(self, position: int) -> int:
+        """
+        Index of the paragraph containing the position, the number of
+        newlines before it.
+        """
+        if position <= self.gap_start:
+            return bisect_left(self.before, position)
+        return len(self.before) + len(self.after) - bisect_right(self.after, len(self) - position)
+
+    def span(self, index: int) -> Row:
+        start = self.newline(index - 1) + 1 if index else 0
+        end = self.newline(index) if index < self.paragraphs - 1 else len(self)
+        return start, end
+
+
+class Edit(object):
+    """
+    One undoable change, `removed` replaced by `inserted` at `position`.
+    """
+
+    def __init__(self, position: int, removed: str, inserted: str, cursor: int):
+        self.position = position
+        self.removed = removed
+        self.inserted = inserted
+        self.cursor = cursor
+
+
+class Editor(Component):
+    """
+    Editable text on a GapBuffer, on a single line or multiple lines.
+
+    Paragraphs are wrapped to the width lazily and only while visible, the
+    wrapped rows of every paragraph are cached by its text, so an edit
+    re-wraps just the paragraph it touches.  Typing, deleting, pasting and
+    undoing cost the size of the edit, not of the text.
+
+    Printable keys are inserted, the arrow, home and end keys move the
+    cursor and extend the selection with shift.  Ctrl-Z undoes and Ctrl-Y
+    redoes.  Keys moving past the edges of the text are left unhandled for
+    the enclosing components.  A single line editor shows the row holding
+    the cursor, leaves enter unhandled and pastes newlines as spaces.
+    """
+    tracked = Component.tracked + ('cursor', 'anchor', 'multiline')
+
+    def __init__(self,
+                 value: str='',
+                 multiline: bool=True,
+                 history: int=1000,
+                 border: Border=Borders.NONE,
+                 padding: Sizing=None,
+                 margin: Sizing=None,
+                 foreground: Color=None,
+                 background: Color=None,
+                 capabilities: Set[Capability]=None):
+        super().__init__(border, padding, margin, foreground, background, capabilities)
+        self.buffer = GapBuffer(value)
+        self.multiline = multiline
+        self.history = history
+        self.cursor = 0
+        self.anchor: Optional[int] = None
+        self.top: Row = (0, 0)
+        self.width = 1
+        self.wrapped: Dict[str, List[Row]] = {}
+        self.edits: List[Edit] = []
+        self.undone: List[Edit] = []
+
+    @property
+    def value(self) -> str:
+        return self.buffer.text()
+
+    @property
+    def selection(self) -> Optional[Row]:
+        if self.anchor is None or self.anchor == self.cursor:
+            return None
+        return min(self.anchor, self.cursor), max(self.anchor, self.cursor)
+
+    def rows(self, paragraph: int) -> Tuple[int, str, List[Row]]:
+        start, end = self.buffer.span(paragraph)
+        text = self.buffer.text(start, end)
+        if text not in self.wrapped:
+            self.wrapped[text] = wrap_offsets(text, self.width)
+        return start, text, self.wrapped[text]
+
+    def locate(self, position: int) -> Tuple[int, int, int]:
+        """
+        The paragraph, row and column in cells of a position.
+        """
+        paragraph = self.buffer.paragraph_of(position)
+        start, text, rows = self.rows(paragraph)
+        offset = position - start
+
+        for row, (row_start, row_end) in enumerate(rows):
+            if offset < row_end or row == len(rows) - 1:
+                return paragraph, row, text_width(text[row_start:offset])
+
+    def position(self, paragraph: int, row: int, column: int) -> int:
+        """
+        The position at a column in cells of a row, or the end of the row.
+        """
+        start, text, rows = self.rows(paragraph)
+        row_start, row_end = rows[row]
+
+        current = 0
+        for idx in range(row_start, row_end):
+            current += char_width(text[idx])
+            if current > column:
+                return start + idx
+
+        if row < len(rows) - 1:
+            # The end of a wrapped row is the start of the next one
+            return start + row_end - 1
+        return start + row_end
+
+    def scroll(self, height: int):
+        """
+        Moves the first row shown, `top`, as little as needed for the cursor
+        to be on screen.
+        """
+        paragraph, row, _ = self.locate(self.cursor)
+
+        if self.top[0] >= self.buffer.paragraphs or (paragraph, row) < self.top:
+            self.top = (paragraph, row)
+            return
+
+        top_rows = self.rows(self.top[0])[2]
+        self.top = (self.top[0], min(self.top[1], len(top_rows) - 1))
+
+        for _ in range(height - 1):
+            if (paragraph, row) <= self.top:
+                return
+            if row:
+                row -= 1
+            else:
+                paragraph -= 1
+                row = len(self.rows(paragraph)[2]) - 1
+
+        if (paragraph, row) > self.top:
+            self.top = (paragraph, row)
+
+    def content(self, width: int, height: int) -> List[Line]:
+        if width != self.width:
+            self.width = width
+            self.wrapped = {}
+            self.top = (self.top[0], 0)
+
+        shown = height if self.multiline else min(height, 1)
+        self.scroll(shown)
+
+        visible = {}
+        result = []
+        paragraph, row = self.top
+        while len(result) < shown and paragraph < self.buffer.paragraphs:
+            start, text, rows = self.rows(paragraph)
+            visible[text] = rows
+
+            for row_start, row_end in rows[row:shown - len(result) + row]:
+                last = row_end == len(text) and (row_start, row_end) == rows[-1]
+                result.append(self.row(start + row_start, start + row_end, last).fit(width))
+
+            paragraph, row = paragraph + 1, 0
+
+        self.wrapped = visible
+        return result + [self.line(' ' * width) for _ in range(height - len(result))]
+
+    def row(self, start: int, end: int, last: bool) -> Line:
+        """
+        Draws the text from start to end, with the selection or the cursor
+        in reverse.  The last row of a paragraph has room for the cursor
+        after its end.
+        """
+        plain = self.fragment('').style
+        marked = plain.with_capability(Capabilities.REVERSE)
+        low, high = self.selection or (self.cursor, self.cursor + 1)
+
+        fragments = []
+        for left, right, style in (
+            (start, max(start, min(end, low)), plain),
+            (max(start, low), min(end, high), marked),
+            (max(start, min(end, high)), end, plain),
+        ):
+            if right > left:
+                fragments.append(Fragment.styled(self.buffer.text(left, right), style))
+
+        if last and self.selection is None and self.cursor == end:
+            fragments.append(Fragment.styled(' ', marked))
+
+        return Line.of(fragments or [Fragment.styled('', plain)])
+
+    def replace(self, start: int, end: int, text: str) -> Result:
+        removed = self.buffer.delete(start, end - start)
+        self.buffer.insert(start, text)
+        self.record(Edit(start, removed, text, self.cursor))
+        self.anchor = None
+        self.cursor = start + len(text)
+        self.invalidate()
+        return Repaint(self)
+
+    def record(self, edit: Edit):
+        self.undone = []
+        last = self.edits[-1] if self.edits else None
+
+        # Typing a word is undone at once
+        if (last is not None and not last.removed and not edit.removed and
+                len(edit.inserted) == 1 and not edit.inserted.isspace() and
+                last.position + len(last.inserted) == edit.position and
+                not last.inserted[-1:].isspace()):
+            last.inserted += edit.inserted
+            return
+
+        self.edits.append(edit)
+        if len(self.edits) > self.history:
+            del self.edits[0]
+
+    def insert(self, text: str) -> Result:
+        if not self.multiline:
+            text = text.replace('\n', ' ')
+        start, end = self.selection or (self.cursor, self.cursor)
+        return self.replace(start, end, text)
+
+    def move(self, position: int, extend: bool) -> Result:
+        if extend:
+            self.anchor = self.cursor if self.anchor is None else self.anchor
+        elif self.selection is None and position == self.cursor:
+            return Unhandled()
+        else:
+            self.anchor = None
+
+        self.cursor = position
+        return Repaint(self)
+
+    def vertical(self, rows: int) -> Optional[int]:
+        """
+        The position the given number of rows up or down, at the same
+        column, None past the first or last row.
+        """
+        paragraph, row, column = self.locate(self.cursor)
+        row += rows
+
+        while row < 0:
+            if paragraph == 0:
+                return None
+            paragraph -= 1
+            row += len(self.rows(paragraph)[2])
+
+        while row >= len(self.rows(paragraph)[2]):
+            if paragraph == self.buffer.paragraphs - 1:
+                return None
+            row -= len(self.rows(paragraph)[2])
+            paragraph += 1
+
+        return self.position(paragraph, row, column)
+
+    def keypress(self, key: Keystroke) -> Result:
+        if key and not key.name and str(key).isprintable():
+            return self.insert(str(key))
+        return Unhandled()
+
+    @binds('KEY_PASTE')
+    def paste(self, key: Keystroke) -> Result:
+        return self.insert(str(key))
+
+    @binds('KEY_ENTER')
+    def newline(self, key: Keystroke) -> Result:
+        return self.insert('\n') if self.multiline else Unhandled()
+
+    @binds('KEY_BACKSPACE')
+    def backspace(self, key: Keystroke) -> Result:
+        if self.selection is not None:
+            return self.replace(*self.selection, '')
+        if self.cursor == 0:
+            return Unhandled()
+        return self.replace(self.cursor - 1, self.cursor, '')
+
+    @binds('KEY_DELETE')
+    def delete(self, key: Keystroke) -> Result:
+        if self.selection is not None:
+            return self.replace(*self.selection, '')
+        if self.cursor == len(self.buffer):
+            return Unhandled()
+        return self.replace(self.cursor, self.cursor + 1, '')
+
+    @binds('KEY_LEFT', 'KEY_SLEFT')
+    def left(self, key: Keystroke) -> Result:
+        extend = key.name == 'KEY_SLEFT'
+        if self.selection is not None and not extend:
+            return self.move(self.selection[0], False)
+        if self.cursor == 0:
+            return Unhandled()
+        return self.move(self.cursor - 1, extend)
+
+    @binds('KEY_RIGHT', 'KEY_SRIGHT')
+    def right(self, key: Keystroke) -> Result:
+        extend = key.name == 'KEY_SRIGHT'
+        if self.selection is not None and not extend:
+            return self.move(self.selection[1], False)
+        if self.cursor == len(self.buffer):
+            return Unhandled()
+        return self.move(self.cursor + 1, extend)
+
+    @binds('KEY_UP', 'KEY_SUP')
+    def up(self, key: Keystroke) -> Result:
+        position = self.vertical(-1) if self.multiline else None
+        return Unhandled() if position is None else self.move(position, key.name == 'KEY_SUP')
+
+    @binds('KEY_DOWN', 'KEY_SDOWN')
+    def down(self, key: Keystroke) -> Result:
+        position = self.vertical(1) if self.multiline else None
+        return Unhandled() if position is None else self.move(position, key.name == 'KEY_SDOWN')
+
+    @binds('KEY_HOME', 'KEY_SHOME')
+    def home(self, key: Keystroke) -> Result:
+        start, _ = self.buffer.span(self.buffer.paragraph_of(self.cursor))
+        return self.move(start, key.name == 'KEY_SHOME')
+
+    @binds('KEY_END', 'KEY_SEND')
+    def end(self, key: Keystroke) -> Result:
+        _, end = self.buffer.span(self.buffer.paragraph_of(self.cursor))
+        return self.move(end, key.name == 'KEY_SEND')
+
+    @binds('\x1a')
+    def undo(self, key: Keystroke) -> Result:
+        if not self.edits:
+            return Unhandled()
+
+        edit = self.edits.pop()
+        self.buffer.delete(edit.position, len(edit.inserted))
+        self.buffer.insert(edit.position, edit.removed)
+        self.undone.append(edit)
+        self.anchor = None
+        self.cursor = edit.cursor
+        self.invalidate()
+        return Repaint(self)
+
+    @binds('\x19')
+    def redo(self, key: Keystroke) -> Result:
+        if not self.undone:
+            return Unhandled()
+
+        edit = self.undone.pop()
+        self.buffer.delete(edit.position, len(edit.removed))
+        self.buffer.insert(edit.position, edit.inserted)
+        self.edits.append(edit)
+        self.anchor = None
+        self.cursor = edit.position + len(edit.inserted)
+        self.invalidate()
+        return Repaint(self)
@@ -0,0 +1,240 @@
+from functools import lru_cache
+from typing import List, Set, Tuple, Optional
+
+from blessed.keyboard import Keystroke
+
+from greenscreen.components.base import Component
+from greenscreen.components.layout import Layout, HorizontalLayout, VerticalLayout, allocate
+from greenscreen.display.border import Border, Borders
+from greenscreen.display.sizing import Sizing
+from greenscreen.display.text import Line, Color, Capability
+from greenscreen.index import ListIndex
+from greenscreen.input import Result, binds
+
+
+class Constraint(object):
+    """
+    Size of one track of a flex or grid layout, a row or a column.
+
+    A track is either `fixed` or takes a share of the space left by the
+    fixed tracks proportional to its `weight`, clamped between `minimum` and
+    `maximum`.  Sizes include the focus ring the layout draws around every
+    child.
+    """
+
+    def __init__(self, weight: int=1, fixed: Optional[int]=None, minimum: int=0, maximum: Optional[int]=None):
+        self.weight = weight
+        self.fixed = fixed
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def of(cls, size: int) -> 'Constraint':
+        return cls(fixed=size)
+
+    def clamp(self, size: int) -> int:
+        size = max(self.minimum, size)
+        return size if self.maximum is None else min(self.maximum, size)
+
+    def key(self) -> Tuple:
+        return self.weight, self.fixed, self.minimum, self.maximum
+
+    def __eq__(self, other):
+        return isinstance(other, Constraint) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return '<Constraint weight={} fixed={} minimum={} maximum={}>'.format(*self.key())
+
+
+@lru_cache(maxsize=1024)
+def solve(amount: int, constraints: Tuple[Constraint, ...]) -> Tuple[int, ...]:
+    """
+    Sizes of the tracks described by the constraints in the given amount.
+
+    Fixed tracks get their size, flexible tracks share the rest by weight
+    as Layout.weighted does.  A share outside the bounds of its track is
+    frozen at the bound and the others share again, minimums first when
+    both kinds are violated, until every share fits.  When even the sizes
+    so found do not fit, tracks are cut in order and later ones may end up
+    empty.  The sizes may add up to less than the amount when every track
+    has reached its maximum.
+
+    Solutions are cached, so resizing back and forth costs a lookup.
+    """
+    sizes = [constraint.fixed or 0 for constraint in constraints]
+    space = amount - sum(sizes)
+
+    free = []
+    for idx, constraint in enumerate(constraints):
+        if constraint.fixed is not None:
+            continue
+        if constraint.weight > 0:
+            free.append(idx)
+        else:
+            sizes[idx] = constraint.clamp(0)
+            space -= sizes[idx]
+
+    while free:
+        shares = allocate(max(0, space), tuple(constraints[idx].weight for idx in free))
+        clamped = [constraints[idx].clamp(share) for idx, share in zip(free, shares)]
+        violation = sum(clamped) - sum(shares)
+
+        if violation == 0:
+            for idx, size in zip(free, clamped):
+                sizes[idx] = size
+            break
+
+        frozen = []
+        for idx, share, size in zip(free, shares, clamped):
+            if (violation > 0 and size > share) or (violation < 0 and size < share):
+                sizes[idx] = size
+                space -= size
+                frozen.append(idx)
+
+        free = [idx for idx in free if idx not in frozen]
+
+    budget = amount
+    for idx, size in enumerate(sizes):
+        sizes[idx] = max(0, min(size, budget))
+        budget -= sizes[idx]
+
+    return tuple(sizes)
+
+
+class HorizontalFlex(HorizontalLayout):
+    """
+    Horizontal layout sizing its children with one Constraint each.
+    """
+    tracked = HorizontalLayout.tracked + ('constraints',)
+
+    def __init__(self,
+                 children: List[Component]=None,
+                 constraints: List[Constraint]=None,
+                 border: Border=Borders.NONE,
+                 padding: Sizing=None,
+                 margin: Sizing=None,
+                 foreground: Color=None,
+                 background: Color=None,
+                 capabilities: Set[Capability]=None):
+        super().__init__(children, None, border, padding, margin, foreground, background, capabilities)
+        constraints = constraints or []
+        self.constraints: List[Constraint] = constraints + [Constraint()] * (len(self.children) - len(constraints))
+
+    def append(self, child: Component, constraint: Constraint=None):
+        self.constraints.append(constraint or Constraint())
+        super().append(child)
+
+    def sizes(self, amount: int) -> List[int]:
+        return list(solve(amount, tuple(self.constraints)))
+
+
+class VerticalFlex(VerticalLayout):
+    """
+    Vertical layout sizing its children with one Constraint each.
+    """
+    tracked = VerticalLayout.tracked + ('constraints',)
+
+    def __init__(self,
+                 children: List[Component]=None,
+                 constraints: List[Constraint]=None,
+                 border: Border=Borders.NONE,
+                 padding: Sizing=None,
+                 margin: Sizing=None,
+                 foreground: Color=None,
+                 background: Color=None,
+                 capabilities: Set[Capability]=None):
+        super().__init__(children, None, border, padding, margin, foreground, background, capabilities)
+        constraints = constraints or []
+        self.constraints: List[Constraint] = constraints + [Constraint()] * (len(self.children) - len(constraints))
+
+    def append(self, child: Component, constraint: Constraint=None):
+        self.constraints.append(constraint or Constraint())
+        super().append(child)
+
+    def sizes(self, amount: int) -> List[int]:
+        return list(solve(amount, tuple(self.constraints)))
+
+
+class GridLayout(Layout):
+    """
+    Places its children row by row into the cells of a grid of column and
+    row tracks.  Without row constraints there are as many equally weighted
+    rows as needed for the children.  Cells without a child stay blank,
+    children beyond the last cell are not shown.
+    """
+    tracked = Layout.tracked + ('columns', 'rows')
+
+    def __init__(self,
+                 children: List[Component]=None,
+                 columns: List[Constraint]=None,
+                 rows: List[Constraint]=None,
+                 border: Border=Borders.NONE,
+                 padding: Sizing=None,
+                 margin: Sizing=None,
+                 foreground: Color=None,
+                 background: Color=None,
+                 capabilities: Set[Capability]=None):
+        super().__init__(border, padding, margin, foreground, background, capabilities)
+        self.debug = False
+        self.weights: List[int] = []
+        self.children: List[Component] = children or []
+        self.columns: List[Constraint] = columns or [Constraint()]
+        self.rows: Optional[List[Constraint]] = rows
+        self.focus = ListIndex(self.children)
+        self.decorated = {}
+
+        for child in self.children:
+            child.parent = self
+
+    def append(self, child: Component):
+        self.children.append(self.adopt(child))
+
+    def tracks(self) -> Tuple[Constraint, ...]:
+        if self.rows is not None:
+            return tuple(self.rows)
+        return (Constraint(),) * -(-len(self.children) // len(self.columns))
+
+    def content(self, width: int, height: int) -> List[Line]:
+        widths = solve(width, tuple(self.columns))
+        heights = solve(height, self.tracks())
+        gap = width - sum(widths)
+
+        result = []
+        for row, row_height in enumerate(heights):
+            if not row_height:
+                continue
+
+            cells = []
+            for column, column_width in enumerate(widths):
+                idx = row * len(widths) + column
+                if idx < len(self.children):
+                    cells.append(self.decorate(idx, self.children[idx], column_width, row_height))
+                else:
+                    cells.append(self.blank(column_width, row_height))
+
+            if gap:
+                cells.append(self.blank(gap, row_height))
+
+            result.extend(Line.join(group) for group in zip(*cells))
+
+        result.extend(self.blank(width, height - sum(heights)))
+        return result
+
+    @binds('KEY_LEFT')
+    def focus_previous(self, key: Keystroke) -> Result:
+        return super().focus_previous(key)
+
+    @binds('KEY_RIGHT')
+    def focus_next(self, key: Keystroke) -> Result:
+        return super().focus_next(key)
+
+    @binds('KEY_UP')
+    def focus_up(self, key: Keystroke) -> Result:
+        return self.move_focus(-len(self.columns))
+
+    @binds('KEY_DOWN')
+    def focus_down(self, key: Keystroke) -> Result:
+        return self.move_focus(len(self.columns))
@@ -1,6 +1,6 @@
 from collections import defaultdict, deque
-from math import floor
-from typing import List, Iterable, Set
+from functools import lru_cache
+from typing import List, Iterable, Set, Tuple, Optional, Dict
 
 from blessed.keyboard import Keystroke
 
@@ -9,10 +9,52 @@ from greenscreen.display.border import Border, Borders
 from greenscreen.display.sizing import Sizing
 from greenscreen.display.text import Line, Color, Capability, Colors
 from greenscreen.index import ListIndex
-from greenscreen.input import Result, Repaint, Unhandled
+from greenscreen.input import Result, Repaint, binds
+
+
+@lru_cache(maxsize=1024)
+def allocate(amount: int, weights: Tuple[int, ...]) -> Tuple[int, ...]:
+    """
+    Closed-form implementation of Layout.weighted.
+
+    Every weight unit is a slot of `size` with the first `remainder` slots
+    holding one extra.  Partitions are taken smallest weight first, each
+    picking every `count`-th remaining slot from the front, so a partition
+    receives one extra for each of its picks that lands inside the run of
+    slots still holding one.  Only that count is needed, not the slots.
+    """
+    partition_count = len(weights)
+    bank_count = sum(weights)
+    size = amount // bank_count
+    remainder = amount - (size * bank_count)
+
+    partitions = defaultdict(deque)
+    for current, weight in enumerate(sorted(weights)):
+        count = partition_count - current
+        extra = min(weight, -(-remainder // count))
+        remainder -= extra
+        partitions[weight].appendleft(weight * size + extra)
+
+    return tuple(partitions[weight].pop() for weight in weights)
+
+
+BLANK = Border(' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ')
 
 
 class Layout(Component):
+    """
+    Base of components arranging children side by side or stacked.
+
+    Every child is drawn inside a one cell ring owned by the layout, the
+    `focus_border` around the focused child and the `blur_border` around
+    the others.  Children are not modified to show focus, so moving it only
+    redraws the rings of the previously and newly focused children, which
+    are cached per child otherwise.
+    """
+    tracked = Component.tracked + ('children', 'weights', 'debug')
+    focus_border = Borders.HEAVY
+    blur_border = BLANK
+
     @classmethod
     def weighted(cls, amount: int, weights: List[int]):
         """
@@ -50,33 +92,79 @@ class Layout(Component):
         :param weights: List of weights
         :return: List of subdivided amounts 
         """
-        partition_count = len(weights)
-        bank_count = sum(weights)
-        size = int(floor(amount / bank_count))
-        bank = [size] * bank_count
-
-        remainder = amount - (size * bank_count)
-        for idx in range(remainder):
-            bank[idx] += 1
-
-        partitions = defaultdict(deque)
-        for current, weight in enumerate(sorted(weights)):
-            partition = 0
-            indices = cls.indices(weight, partition_count - current)
-            for idx in indices:
-                partition += bank.pop(idx)
-            partitions[weight].appendleft(partition)
+        return list(allocate(amount, tuple(weights)))
 
+    @classmethod
+    def weighted_batch(cls, requests: Iterable[Tuple[int, List[int]]]) -> List[List[int]]:
+        """
+        Computes Layout.weighted for many (amount, weights) pairs at once,
+        identical requests are only computed once.
+        """
+        solved = {}
         result = []
-        for weight in weights:
-            result.append(partitions[weight].pop())
-
+        for amount, weights in requests:
+            key = (amount, tuple(weights))
+            if key not in solved:
+                solved[key] = allocate(*key)
+            result.append(list(solved[key]))
         return result
 
     @classmethod
     def indices(cls, size: int, count: int) -> Iterable[int]:
         return range((size - 1) * count, -1, -count)
 
+    @property
+    def focused(self) -> Optional[Component]:
+        return self.focus.value
+
+    def sizes(self, amount: int) -> List[int]:
+        """
+        Sizes of the children along the axis of the layout, the space they
+        leave over is left blank.
+        """
+        return self.weighted(amount, self.weights)
+
+    def blank(self, width: int, height: int) -> List[Line]:
+        return [self.line(' ' * width) for _ in range(height)]
+
+    def decorate(self, idx: int, child: Component, width: int, height: int) -> List[Line]:
+        if width < 3 or height < 3:
+            return [Line('.' * width) for _ in range(height)]
+
+        lines = child.render(width - 2, height - 2)
+        border = self.focus_border if idx == self.focus.index else self.blur_border
+        key = (child, width, height, child.version, border)
+
+        cached = self.decorated.get(idx)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        left = child.fragment(border.left_border())
+        right = child.fragment(border.right_border())
+        decorated = (
+            [child.line(border.top_border(width))] +
+            [Line.of([left, *line.fragments, right]) for line in lines] +
+            [child.line(border.bottom_border(width))]
+        )
+
+        self.decorated[idx] = (key, decorated)
+        return decorated
+
+    def move_focus(self, amount: int) -> Result:
+        if amount < 0:
+            self.focus.decr(-amount)
+        else:
+            self.focus.incr(amount)
+        self.invalidate()
+        self.refocus()
+        return Repaint(self)
+
+    def focus_previous(self, key: Keystroke) -> Result:
+        return self.move_focus(-1)
+
+    def focus_next(self, key: Keystroke) -> Result:
+        return self.move_focus(1)
+
 
 class HorizontalLayout(Layout):
     def __init__(self,
@@ -94,22 +182,23 @@ class HorizontalLayout(Layout):
         self.children: List[Component] = children or []
         self.repack(self.weights)
         self.focus = ListIndex(self.children)
+        self.decorated: Dict[int, Tuple[Tuple, List[Line]]] = {}
+
+        for child in self.children:
+            child.parent = self
 
     def repack(self, weights: List[int]):
         self.weights = weights + ([1] * (max(0, len(self.children) - len(weights))))
 
     def append(self, child: Component, weight: int = 1):
-        self.children.append(child)
+        self.children.append(self.adopt(child))
         self.weights.append(weight)
 
     def combine(self, lines: Iterable[Line]) -> Line:
-        result, *tail = lines
-        for line in tail:
-            result += line
-        return result
+        return Line.join(lines)
 
     def content(self, width: int, height: int) -> List[Line]:
-        widths = self.weighted(width, self.weights)
+        widths = self.sizes(width)
 
         if self.debug:
             debug = Line('{width}x{height} Weights: {weights}, Widths: {widths}'.format(
@@ -124,26 +213,21 @@ class HorizontalLayout(Layout):
         columns = []
         for idx, zipped in enumerate(zip(widths, self.children)):
             child_width, component = zipped
-            component.border = Borders.HEAVY if idx == self.focus.index else Borders.NONE
-            component.margin = Sizing(0, 0, 0, 0) if idx == self.focus.index else Sizing(1, 1, 1, 1)
-            columns.append(component.render(child_width, height))
+            columns.append(self.decorate(idx, component, child_width, height))
+
+        if width > sum(widths):
+            columns.append(self.blank(width - sum(widths), height))
 
         result = [self.combine(group) for group in zip(*columns)]
         return [debug.fit(width)] + result if self.debug else result
 
-    def dispatch_keypress(self, key: Keystroke) -> Result:
-        return self.focus.value.handle_keypress(key) if self.focus.value else Unhandled()
-
-    def after_keypress(self, key: Keystroke) -> Result:
-        if key.name == 'KEY_LEFT':
-            self.focus.decr()
-            return Repaint(self)
-
-        if key.name == 'KEY_RIGHT':
-            self.focus.incr()
-            return Repaint(self)
+    @binds('KEY_LEFT')
+    def focus_previous(self, key: Keystroke) -> Result:
+        return super().focus_previous(key)
 
-        return Unhandled()
+    @binds('KEY_RIGHT')
+    def focus_next(self, key: Keystroke) -> Result:
+        return super().focus_next(key)
 
 
 class VerticalLayout(Layout):
@@ -162,18 +246,22 @@ class VerticalLayout(Layout):
         self.children: List[Component] = children or []
         self.repack(self.weights)
         self.focus = ListIndex(self.children)
+        self.decorated: Dict[int, Tuple[Tuple, List[Line]]] = {}
+
+        for child in self.children:
+            child.parent = self
 
     def repack(self, weights: List[int]):
         self.weights = weights + ([1] * (max(0, len(self.children) - len(weights))))
 
     def append(self, child: Component, weight: int = 1):
-        self.children.append(child)
+        self.children.append(self.adopt(child))
         self.weights.append(weight)
 
     def content(self, width: int, height: int) -> List[Line]:
         height = height - 1 if self.debug else height
 
-        heights = self.weighted(height, self.weights)
+        heights = self.sizes(height)
 
         if self.debug:
             debug = Line('{width}x{height} Weights: {weights}, Heights: {heights}'.format(
@@ -187,24 +275,18 @@ class VerticalLayout(Layout):
 
         for idx, zipped in enumerate(zip(heights, self.children)):
             child_height, component = zipped
-            component.border = Borders.HEAVY if idx == self.focus.index else Borders.NONE
-            component.margin = Sizing(0, 0, 0, 0) if idx == self.focus.index else Sizing(1, 1, 1, 1)
-            result.extend(component.render(width, child_height))
-
-        return result
+            result.extend(self.decorate(idx, component, width, child_height))
 
-    def dispatch_keypress(self, key: Keystroke) -> Result:
-        return self.focus.value.handle_keypress(key) if self.focus.value else Unhandled()
+        result.extend(self.blank(width, height - sum(heights)))
 
-    def after_keypress(self, key: Keystroke) -> Result:
-        if key.name == 'KEY_UP':
-            self.focus.decr()
-            return Repaint(self)
+        return result
 
-        if key.name == 'KEY_DOWN':
-            self.focus.incr()
-            return Repaint(self)
+    @binds('KEY_UP')
+    def focus_previous(self, key: Keystroke) -> Result:
+        return super().focus_previous(key)
 
-        return Unhandled()
+    @binds('KEY_DOWN')
+    def focus_next(self, key: Keystroke) -> Result:
+        return super().focus_next(key)
 
 
@@ -0,0 +1,206 @@
+from typing import List, Set, Sequence, Callable, Optional, Tuple
+
+from blessed.keyboard import Keystroke
+
+from greenscreen.components.base import Component
+from greenscreen.display.border import Borders, Border
+from greenscreen.display.sizing import Sizing
+from greenscreen.display.text import Line, Fragment, Color, Capability, Capabilities, text_width, clip
+from greenscreen.input import Result, Unhandled, Repaint, binds
+
+
+class Column(object):
+    """
+    One column of a DataGrid, a title over a sequence of values.
+
+    Values can be any sequence supporting len() and indexing, like a list,
+    an array.array, a NumPy array or a memoryview, and are only read for
+    the rows on screen.  `format` turns a value into its text.  Unless a
+    fixed `width` is given, the column is as wide as its title and the
+    widest of up to `sample` values spread over the column, at most
+    `maximum`.  The measured width is kept until the values are replaced
+    or change length.
+    """
+
+    def __init__(self,
+                 title: str,
+                 values: Sequence,
+                 format: Callable[[object], str]=str,
+                 width: Optional[int]=None,
+                 maximum: int=40,
+                 right: bool=False,
+                 sample: int=1000):
+        self.title = title
+        self.values = values
+        self.format = format
+        self.width = width
+        self.maximum = maximum
+        self.right = right
+        self.sample = sample
+        self.measured: Optional[Tuple[Sequence, int, int]] = None
+
+    def measure(self) -> int:
+        if self.width is not None:
+            return self.width
+
+        count = len(self.values)
+        if self.measured is not None and self.measured[0] is self.values and self.measured[1] == count:
+            return self.measured[2]
+
+        step = max(1, count // self.sample)
+        width = max([text_width(self.title)] + [
+            text_width(self.format(self.values[idx]))
+            for idx in range(0, count, step)
+        ])
+        width = min(width, self.maximum)
+
+        self.measured = (self.values, count, width)
+        return width
+
+    def cell(self, index: int) -> str:
+        return self.format(self.values[index]) if index < len(self.values) else ''
+
+    def __len__(self):
+        return len(self.values)
+
+
+def pad(text: str, width: int, right: bool=False) -> str:
+    if text_width(text) > width:
+        text = clip(text, width - 1) + '…' if width else ''
+
+    gap = ' ' * (width - text_width(text))
+    return gap + text if right else text + gap
+
+
+class DataGrid(Component):
+    """
+    Table over columnar data that only formats the cells on screen.
+
+    The header row stays at the top while the rows scroll with the arrow,
+    page, home and end keys.  Shift left and right scroll the columns.  At
+    the edges those keys are left unhandled for the enclosing components,
+    like a layout moving focus.
+    """
+    tracked = Component.tracked + ('columns', 'row', 'column')
+
+    def __init__(self,
+                 columns: List[Column],
+                 border: Border=Borders.NONE,
+                 padding: Sizing=None,
+                 margin: Sizing=None,
+                 foreground: Color=None,
+                 background: Color=None,
+                 capabilities: Set[Capability]=None):
+        super().__init__(border, padding, margin, foreground, background, capabilities)
+        self.columns = columns
+        self.row = 0
+        self.column = 0
+        self.page = 1
+        self.separator = ' '
+
+    @property
+    def count(self) -> int:
+        return max([len(column) for column in self.columns] or [0])
+
+    def visible(self, width: int) -> List[Tuple[Column, int]]:
+        """
+        The columns on screen from the first scrolled to, with the width each
+        one gets, the last one possibly cut.
+        """
+        result = []
+        available = width
+        for column in self.columns[self.column:]:
+            if available <= 0:
+                break
+
+            column_width = min(column.measure(), available)
+            result.append((column, column_width))
+            available -= column_width + len(self.separator)
+
+        return result
+
+    def cells(self, visible: List[Tuple[Column, int]], texts: List[str], capabilities: Set[Capability]) -> Line:
+        fragments = []
+        for (column, column_width), text in zip(visible, texts):
+            if fragments:
+                fragments.append(self.fragment(self.separator))
+            fragments.append(Fragment(
+                pad(text, column_width, column.right),
+                self.foreground,
+                self.background,
+                capabilities
+            ))
+        return Line.of(fragments or [self.fragment('')])
+
+    def content(self, width: int, height: int) -> List[Line]:
+        visible = self.visible(width)
+        header_capabilities = set(self.capabilities) | {Capabilities.REVERSE}
+
+        header = self.cells(visible, [column.title for column, _ in visible], header_capabilities)
+        self.page = max(1, height - 1)
+        top = self.top
+
+        result = [header.fit(width)]
+        for index in range(top, min(top + height - 1, self.count)):
+            texts = [column.cell(index) for column, _ in visible]
+            result.append(self.cells(visible, texts, self.capabilities).fit(width))
+
+        result.extend(self.line(' ' * width) for _ in range(height - len(result)))
+        return result
+
+    @property
+    def last_row(self) -> int:
+        return max(0, self.count - self.page)
+
+    @property
+    def top(self) -> int:
+        # Rendering doesn't clamp the tracked row, which would invalidate it
+        return min(self.row, self.last_row)
+
+    def scroll_to(self, row: int) -> Result:
+        row = max(0, min(row, self.last_row))
+        if row == self.top:
+            return Unhandled()
+
+        self.row = row
+        return Repaint(self)
+
+    def scroll_columns_to(self, column: int) -> Result:
+        column = max(0, min(column, len(self.columns) - 1))
+        if column == self.column:
+            return Unhandled()
+
+        self.column = column
+        return Repaint(self)
+
+    @binds('KEY_UP')
+    def scroll_up(self, key: Keystroke) -> Result:
+        return self.scroll_to(self.top - 1)
+
+    @binds('KEY_DOWN')
+    def scroll_down(self, key: Keystroke) -> Result:
+        return self.scroll_to(self.top + 1)
+
+    @binds('KEY_PGUP')
+    def page_up(self, key: Keystroke) -> Result:
+        return self.scroll_to(self.top - self.page)
+
+    @binds('KEY_PGDOWN')
+    def page_down(self, key: Keystroke) -> Result:
+        return self.scroll_to(self.top + self.page)
+
+    @binds('KEY_HOME')
+    def scroll_home(self, key: Keystroke) -> Result:
+        return self.scroll_to(0)
+
+    @binds('KEY_END')
+    def scroll_end(self, key: Keystroke) -> Result:
+        return self.scroll_to(self.last_row)
+
+    @binds('KEY_SLEFT')
+    def scroll_left(self, key: Keystroke) -> Result:
+        return self.scroll_columns_to(self.column - 1)
+
+    @binds('KEY_SRIGHT')
+    def scroll_right(self, key: Keystroke) -> Result:
+        return self.scroll_columns_to(self.column + 1)
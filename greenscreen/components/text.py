@@ -1,13 +1,17 @@
+from bisect import bisect_right
+from collections import deque
 from math import floor, ceil
-from typing import List, Set
+from typing import List, Set, Dict, Optional, Tuple, Deque, Iterable
 
 from greenscreen.components.base import Component
 from greenscreen.display.border import Borders, Border
 from greenscreen.display.sizing import Sizing
-from greenscreen.display.text import Line, Color, Capability, Colors
+from greenscreen.display.text import Line, Color, Capability, Colors, wrap_text
+from greenscreen.input import Async, Result, Repaint
 
 
 class Text(Component):
+    tracked = Component.tracked + ('value', 'offset')
 
     def __init__(self,
                  value: str,
@@ -23,9 +27,11 @@ class Text(Component):
         self.value = self.line(value)
         self.offset = 0
 
+    def rows(self, width: int, height: int) -> List[Line]:
+        return self.value.wrap(width)[self.offset:]
+
     def content(self, width: int, height: int) -> List[Line]:
-        lines = self.value.wrap(width)
-        lines = lines[self.offset:]
+        lines = self.rows(width, height)
 
         if len(lines) < height:
             remainder = height - len(lines)
@@ -41,3 +47,230 @@ class Text(Component):
             lines = lines[:height - 1] + [self.line((' ' * (width - 3)) + ' ↓ ')]
 
         return [line.fit(width) for line in lines]
+
+
+class VirtualText(Text):
+    """
+    Text for very large values, like log files.
+
+    Instead of wrapping the whole value on every frame, the value is split
+    into paragraphs at newlines which are wrapped lazily, only as far as
+    needed to reach the visible window.  The starting offset and first row of
+    every paragraph seen so far are kept as an index that is reused across
+    frames and only rebuilt when the width or the value changes.
+
+    Unlike Text, newlines in the value are preserved and the value is drawn
+    in a single style.
+    """
+
+    def __init__(self,
+                 value: str,
+                 border: Border=Borders.NONE,
+                 padding: Sizing=None,
+                 margin: Sizing=None,
+                 foreground: Color=None,
+                 background: Color=None,
+                 capabilities: Set[Capability]=None):
+        super().__init__(value, border, padding, margin, foreground, background, capabilities)
+        self.indexed: Optional[Tuple[Line, int]] = None
+        self.text = ''
+        self.starts: List[int] = []
+        self.firsts: List[int] = []
+        self.total: Optional[int] = None
+        self.wrapped: Dict[int, List[str]] = {}
+
+    @property
+    def source(self) -> str:
+        return ''.join([fragment.text for fragment in self.value.fragments])
+
+    def reindex(self, width: int):
+        if self.indexed is not None and self.indexed[0] is self.value and self.indexed[1] == width:
+            return
+
+        self.indexed = (self.value, width)
+        self.text = self.source
+        self.starts = [0]
+        self.firsts = [0]
+        self.total = None
+        self.wrapped = {}
+
+    def paragraph(self, index: int) -> str:
+        start = self.starts[index]
+        end = self.text.find('\n', start)
+        return self.text[start:] if end == -1 else self.text[start:end]
+
+    def wrap(self, index: int, width: int) -> List[str]:
+        if index not in self.wrapped:
+            self.wrapped[index] = wrap_text(self.paragraph(index), width) or ['']
+        return self.wrapped[index]
+
+    def extend(self, width: int):
+        index = len(self.starts) - 1
+        first = self.firsts[index] + len(self.wrap(index, width))
+        end = self.text.find('\n', self.starts[index])
+
+        if end == -1:
+            self.total = first
+        else:
+            self.starts.append(end + 1)
+            self.firsts.append(first)
+
+    def locate(self, row: int, width: int) -> Optional[Tuple[int, int]]:
+        while self.total is None and self.firsts[-1] <= row:
+            self.extend(width)
+
+        if self.total is not None and row >= self.total:
+            return None
+
+        index = bisect_right(self.firsts, row) - 1
+        return index, row - self.firsts[index]
+
+    def rows(self, width: int, height: int) -> List[Line]:
+        self.reindex(width)
+
+        located = self.locate(self.offset, width)
+        if located is None:
+            return []
+
+        index, skip = located
+        visible = {}
+        result = []
+
+        while len(result) <= height:
+            visible[index] = self.wrap(index, width)
+            result.extend(visible[index][skip:])
+            skip = 0
+
+            if self.locate(self.firsts[index] + len(visible[index]), width) is None:
+                break
+            index += 1
+
+        self.wrapped = visible
+        return [self.line(row) for row in result[:height + 1]]
+
+
+class StreamText(Text):
+    """
+    Text that is fed incrementally, like a tailed log.
+
+    Appended text is split into lines at newlines, text after the last
+    newline is shown and continued by the next append, so chunks read from
+    a stream and lines read with readline() both end up as whole lines.
+    Lines are kept in a ring buffer of at most `retention` lines,
+    the oldest lines are dropped as new ones arrive, so memory stays
+    constant.  Every line is wrapped once when it is appended and again only
+    if the width changes.
+
+    While `follow` is set the last rows are shown, otherwise `offset` is the
+    first row shown from the top of the retained lines.  Values delivered by
+    an Async job with this component as its source are appended, so an async
+    generator can feed it directly.
+    """
+    tracked = Text.tracked + ('follow',)
+
+    def __init__(self,
+                 value: str='',
+                 retention: int=10000,
+                 border: Border=Borders.NONE,
+                 padding: Sizing=None,
+                 margin: Sizing=None,
+                 foreground: Color=None,
+                 background: Color=None,
+                 capabilities: Set[Capability]=None):
+        if retention < 1:
+            raise ValueError('StreamText retention must be at least 1 line, got {}'.format(retention))
+
+        super().__init__('', border, padding, margin, foreground, background, capabilities)
+        self.retention = retention
+        self.follow = True
+        self.lines: Deque[str] = deque()
+        self.wrapped: Deque[List[str]] = deque()
+        self.width: Optional[int] = None
+        self.count = 0
+        self.open = False
+
+        if value:
+            self.append(value)
+
+    def append(self, text: str):
+        if not text:
+            return
+
+        lines = text.split('\n')
+        if self.open:
+            lines[0] = self.pop() + lines[0]
+
+        # A newline ends a line, it doesn't start another one
+        self.open = lines[-1] != ''
+        if not self.open:
+            lines.pop()
+
+        for line in lines:
+            if len(self.lines) == self.retention:
+                self.evict()
+
+            self.lines.append(line)
+            if self.width is not None:
+                rows = wrap_text(line, self.width) or ['']
+                self.wrapped.append(rows)
+                self.count += len(rows)
+
+        self.invalidate()
+
+    def feed(self, lines: Iterable[str]):
+        for line in lines:
+            self.append(line)
+
+    def pop(self) -> str:
+        if self.width is not None:
+            self.count -= len(self.wrapped.pop())
+        return self.lines.pop()
+
+    def evict(self):
+        self.lines.popleft()
+        if self.width is None:
+            return
+
+        rows = len(self.wrapped.popleft())
+        self.count -= rows
+        if not self.follow:
+            self.offset = max(0, self.offset - rows)
+
+    def rewrap(self, width: int):
+        self.width = width
+        self.wrapped = deque(wrap_text(line, width) or [''] for line in self.lines)
+        self.count = sum(len(rows) for rows in self.wrapped)
+
+    def rows(self, width: int, height: int) -> List[Line]:
+        if width != self.width:
+            self.rewrap(width)
+
+        if self.follow:
+            start = max(0, self.count - height)
+        else:
+            start = min(self.offset, self.count)
+
+        result = []
+        if start * 2 > self.count:
+            row = self.count
+            for wrapped in reversed(self.wrapped):
+                if row <= start:
+                    break
+                row -= len(wrapped)
+                result[:0] = wrapped
+            result = result[start - row:]
+        else:
+            row = 0
+            for wrapped in self.wrapped:
+                if row >= start + height + 1:
+                    break
+                result.extend(wrapped)
+                row += len(wrapped)
+            result = result[start:]
+
+        lines = [self.line(row) for row in result[:height + 1]]
+        return lines + [self.line(' ' * width) for _ in range(height - len(lines))]
+
+    def handle_async(self, job: Async, value) -> Result:
+        self.append(value)
+        return Repaint(self)
@@ -0,0 +1,127 @@
+from typing import List, Tuple
+
+from blessed import Terminal
+
+from greenscreen.display.text import Line, Style, char_width
+
+Row = Tuple[List[str], List[Style]]
+
+PLAIN = Style.of()
+
+# Synchronized output (DEC private mode 2026), ignored by terminals without it
+BEGIN_SYNC = '\x1b[?2026h'
+END_SYNC = '\x1b[?2026l'
+
+
+class FrameBuffer(object):
+    """
+    Keeps the last frame written to the terminal as a grid of cells and
+    renders new frames as the difference against it.
+
+    Each row holds the characters and the styles of its cells in two
+    parallel lists.  A wide character is followed by a continuation cell
+    with an empty character and combining characters are joined to the cell
+    before them.  Drawing a frame rasterizes the lines into a back buffer,
+    compares it row by row with the front buffer and only emits cursor
+    movements, style changes and characters for the cells that differ.  The
+    back buffer then becomes the front buffer.
+
+    The buffer starts from a cleared screen whenever it is new, invalidated
+    or the frame dimensions change.
+    """
+
+    def __init__(self):
+        self.front: List[Row] = []
+        self.width = 0
+        self.height = 0
+
+    def invalidate(self):
+        self.front = []
+
+    @classmethod
+    def blank(cls, width: int) -> Row:
+        return [' '] * width, [PLAIN] * width
+
+    @classmethod
+    def rasterize(cls, lines: List[Line], width: int, height: int) -> List[Row]:
+        grid = []
+
+        for line in lines[:height]:
+            chars = []
+            styles = []
+            for fragment in line.fragments:
+                style = fragment.style
+
+                if fragment.text.isascii():
+                    chars.extend(fragment.text)
+                    styles.extend([style] * len(fragment.text))
+                    continue
+
+                for char in fragment.text:
+                    size = char_width(char)
+                    if size == 0 and chars:
+                        # Marks belong to the cell a wide character starts in
+                        chars[-2 if chars[-1] == '' else -1] += char
+                    elif size == 2:
+                        chars.extend((char, ''))
+                        styles.extend((style, style))
+                    elif size == 1:
+                        chars.append(char)
+                        styles.append(style)
+
+            if len(chars) < width:
+                chars.extend([' '] * (width - len(chars)))
+                styles.extend([PLAIN] * (width - len(styles)))
+            elif len(chars) > width:
+                if chars[width] == '':
+                    # The last wide character was cut in half
+                    chars[width - 1] = ' '
+                del chars[width:]
+                del styles[width:]
+
+            grid.append((chars, styles))
+
+        for _ in range(height - len(grid)):
+            grid.append(cls.blank(width))
+
+        return grid
+
+    def draw(self, terminal: Terminal, lines: List[Line], width: int, height: int) -> str:
+        back = self.rasterize(lines, width, height)
+        normal = str(terminal.normal)
+        output = []
+
+        if not self.front or (width, height) != (self.width, self.height):
+            output.append(normal)
+            output.append(str(terminal.clear))
+            self.front = [self.blank(width) for _ in range(height)]
+            self.width = width
+            self.height = height
+
+        current = PLAIN
+        for y, ((old_chars, old_styles), (chars, styles)) in enumerate(zip(self.front, back)):
+            if old_chars == chars and old_styles == styles:
+                continue
+
+            cursor = None
+            for x, char in enumerate(chars):
+                style = styles[x]
+                if not char or (char == old_chars[x] and style is old_styles[x]):
+                    continue
+
+                if cursor != x:
+                    output.append(str(terminal.move(y, x)))
+
+                if style is not current:
+                    output.append(normal)
+                    output.append(style.escape(terminal)[0])
+                    current = style
+
+                output.append(char)
+                cursor = x + (2 if x + 1 < width and not chars[x + 1] else 1)
+
+        if current is not PLAIN:
+            output.append(normal)
+
+        self.front = back
+        return ''.join(output)
@@ -1,4 +1,6 @@
 class Sizing(object):
+    __slots__ = ('top', 'right', 'bottom', 'left')
+
     def __init__(self, top: int=0, right: int=0, bottom: int=0, left: int=0):
         self.top = top
         self.right = right
@@ -12,3 +14,13 @@ class Sizing(object):
     def horizontal(self, size: int):
         self.left = size
         self.right = size
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Sizing) and
+            (self.top, self.right, self.bottom, self.left) ==
+            (other.top, other.right, other.bottom, other.left)
+        )
+
+    def __hash__(self):
+        return hash((self.top, self.right, self.bottom, self.left))
@@ -1,13 +1,202 @@
-from textwrap import wrap
-from typing import List, Union, Set, Optional
+from itertools import chain
+from textwrap import TextWrapper
+from typing import List, Union, Set, Optional, Dict, Tuple, FrozenSet, Iterable, Hashable
 
 from blessed import Terminal
-from copy import copy
+from wcwidth import wcwidth
+
+WIDTHS: Dict[str, int] = {}
+# Words and the break points within them, like hyphens, as textwrap finds them
+CHUNKS = TextWrapper.wordsep_re
+# Whitespace is wrapped and drawn as spaces after expanding tabs, as textwrap does
+WHITESPACE = str.maketrans('\t\n\x0b\x0c\r', '     ')
+
+Span = Tuple[int, int]
+
+
+def char_width(char: str) -> int:
+    """
+    Display width of a single character, 0 for combining and non-printable
+    characters and 2 for wide ones.  Widths are looked up once per code point
+    and cached.
+    """
+    width = WIDTHS.get(char)
+    if width is None:
+        width = WIDTHS[char] = max(0, wcwidth(char))
+    return width
+
+
+def text_width(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    return sum(map(char_width, text))
+
+
+def clip(text: str, width: int) -> str:
+    """
+    Longest prefix of text that fits in the given display width.
+    """
+    if text.isascii():
+        return text[:max(0, width)]
+
+    current = 0
+    for idx, char in enumerate(text):
+        current += char_width(char)
+        if current > width:
+            return text[:idx]
+    return text
+
+
+def wrap_offsets(text: str, width: int) -> List[Span]:
+    """
+    Breaks text into rows of at most width cells without dropping any
+    character, as (start, end) offsets.  A full last row is followed by an
+    empty one to hold a cursor at the end.
+    """
+    width = max(1, width)
+
+    if text.isascii():
+        rows = [(start, min(start + width, len(text))) for start in range(0, len(text), width)]
+        full = bool(rows) and rows[-1][1] - rows[-1][0] == width
+    else:
+        rows = []
+        start = current = 0
+        for idx, char in enumerate(text):
+            size = char_width(char)
+            if current + size > width:
+                rows.append((start, idx))
+                start, current = idx, 0
+            current += size
+        if start < len(text):
+            rows.append((start, len(text)))
+        full = bool(rows) and text_width(text[rows[-1][0]:]) >= width
+
+    if not rows or full:
+        rows.append((len(text), len(text)))
+    return rows
+
+
+def break_word(word: str, space: int) -> str:
+    """
+    Head of a word too wide for a row to put in the space left on it, cut
+    after its last hyphen that fits like textwrap does.
+    """
+    head = clip(word, space)
+    hyphen = head.rfind('-')
+    if hyphen > 0 and head[:hyphen].strip('-'):
+        head = head[:hyphen + 1]
+    return head
+
+
+def wrap_words(text: str, width: int) -> List[Span]:
+    """
+    Breaks text into rows of at most width cells, as (start, end) offsets,
+    like textwrap.wrap() but measured in display cells.  Rows break at
+    whitespace, which is dropped, and after hyphens within words.  A word
+    wider than a row starts on the current row and is split over as many
+    rows as it takes.  Text without words has no rows.
+
+    Tabs and other whitespace are expected to be replaced by spaces.
+    """
+    width = max(1, width)
+    rows: List[Span] = []
+    start = end = used = 0
+
+    for match in CHUNKS.finditer(text):
+        chunk_start, chunk_end = match.span()
+        if text[chunk_start] == ' ':
+            continue
+
+        # Leading whitespace starts the first row like a gap
+        gap = text_width(text[end:chunk_start])
+        size = text_width(match.group())
+
+        if not end and gap > width:
+            # textwrap fills whole rows with it and drops them
+            gap = (gap - 1) % width + 1
+            start = chunk_start - gap
+
+        if used + gap + size <= width:
+            end, used = chunk_end, used + gap + size
+            continue
+
+        if size <= width:
+            if end > start:
+                rows.append((start, end))
+            start, end, used = chunk_start, chunk_end, size
+            continue
+
+        while size > width - used - gap:
+            head = break_word(text[chunk_start:chunk_end], width - used - gap)
+            if not head and not used and not gap:
+                # A character wider than a row gets one of its own
+                head = text[chunk_start]
+
+            if head:
+                rows.append((start, chunk_start + len(head)))
+                chunk_start += len(head)
+                size = text_width(text[chunk_start:chunk_end])
+            elif gap and used + gap == width and (end > start or not rows):
+                # Like textwrap, whitespace filling up the row is kept on it
+                rows.append((start, chunk_start))
+            elif end > start:
+                rows.append((start, end))
+
+            start = end = chunk_start
+            used = gap = 0
+
+        end, used = chunk_end, used + gap + size
+
+    if end > start:
+        rows.append((start, end))
+    return rows
+
+
+def expand_tabs(texts: Iterable[str]) -> List[str]:
+    """
+    Expands tabs in consecutive pieces of text as if they were one.
+    """
+    result = []
+    column = 0
+    for text in texts:
+        if '\t' in text:
+            lead = 'x' * (column % 8)
+            text = (lead + text).expandtabs()[len(lead):]
+
+        newline = max(text.rfind('\n'), text.rfind('\r'))
+        column = column + len(text) if newline == -1 else len(text) - newline - 1
+        result.append(text)
+    return result
+
+
+def wrap_text(text: str, width: int) -> List[str]:
+    text = text.expandtabs().translate(WHITESPACE)
+    return [text[start:end] for start, end in wrap_words(text, width)]
 
 
 class Capability(object):
+    """
+    A text attribute, like bold.  Every named capability is given one bit so
+    sets of them can be held by Style as a bitmask.
+    """
+    __slots__ = ('name', 'bit')
+
+    bits: Dict[str, int] = {}
+    registry: Dict[int, 'Capability'] = {}
+
     def __init__(self, name: str):
         self.name = name
+        self.bit = Capability.bits.setdefault(name, 1 << len(Capability.bits))
+        Capability.registry.setdefault(self.bit, self)
+
+    def __eq__(self, other):
+        return isinstance(other, Capability) and self.name == other.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __reduce__(self):
+        return Capability, (self.name,)
 
     def __repr__(self):
         return '<Capability {}>'.format(self.name)
@@ -28,10 +217,22 @@ class Capabilities(object):
 
 
 class Color(object):
+    __slots__ = ('color', 'bright')
+
     def __init__(self, color: str, bright: bool=False):
         self.color = color
         self.bright = bright
 
+    def __eq__(self, other):
+        return (
+            isinstance(other, Color) and
+            self.color == other.color and
+            self.bright == other.bright
+        )
+
+    def __hash__(self):
+        return hash((self.color, self.bright))
+
     def __repr__(self):
         template = '<Color bright {}>' if self.bright else '<Color {}>'
         return template.format(self.color)
@@ -61,18 +262,66 @@ class Colors(object):
     BRIGHT_WHITE = Color('white', bright=True)
 
 
-class Fragment(object):
-    def __init__(self,
-                 text: str,
-                 foreground: Optional[Color]=None,
-                 background: Optional[Color]=None,
-                 capabilities: Set[Capability]=None):
-        self.text: str = text
-        self.foreground: Optional[Color] = foreground
-        self.background: Optional[Color] = background
-        self.capabilities: Set[Capability] = capabilities or set()
+class Style(object):
+    """
+    Immutable combination of foreground, background and capabilities, the
+    latter held as a bitmask of Capability bits.
+
+    Styles are interned, use Style.of to obtain one, so that equal styles are
+    the same object and can be compared by identity.  Derive new styles with
+    the with_* methods instead of changing one.  The escape sequences for a
+    style are resolved once per kind of terminal and reused.
+    """
+    __slots__ = ('foreground', 'background', 'mask', 'sequences')
+
+    table: Dict[Tuple, 'Style'] = {}
+
+    def __init__(self, foreground: Optional[Color], background: Optional[Color], mask: int):
+        self.foreground = foreground
+        self.background = background
+        self.mask = mask
+        self.sequences: Dict[Hashable, Tuple[str, str]] = {}
+
+    @classmethod
+    def of(cls,
+           foreground: Optional[Color]=None,
+           background: Optional[Color]=None,
+           capabilities: Iterable[Capability]=None) -> 'Style':
+        mask = 0
+        for capability in capabilities or ():
+            mask |= capability.bit
+        return cls.interned(foreground, background, mask)
 
-    def escape(self, terminal: Terminal):
+    @classmethod
+    def interned(cls, foreground: Optional[Color], background: Optional[Color], mask: int) -> 'Style':
+        key = (foreground, background, mask)
+        style = cls.table.get(key)
+        if style is None:
+            style = cls.table[key] = cls(*key)
+        return style
+
+    @property
+    def capabilities(self) -> FrozenSet[Capability]:
+        return frozenset(
+            capability
+            for bit, capability in Capability.registry.items()
+            if self.mask & bit
+        )
+
+    @property
+    def plain(self) -> bool:
+        return not (self.foreground or self.background or self.mask)
+
+    def with_foreground(self, color: Optional[Color]) -> 'Style':
+        return Style.interned(color, self.background, self.mask)
+
+    def with_background(self, color: Optional[Color]) -> 'Style':
+        return Style.interned(self.foreground, color, self.mask)
+
+    def with_capability(self, capability: Capability) -> 'Style':
+        return Style.interned(self.foreground, self.background, self.mask | capability.bit)
+
+    def attributes(self) -> List[str]:
         attributes = []
 
         if self.foreground:
@@ -81,26 +330,96 @@ class Fragment(object):
         if self.background:
             attributes.append('on_{}'.format(self.background.blessed()))
 
-        for capability in self.capabilities:
+        for capability in sorted(self.capabilities, key=lambda c: c.name):
             attributes.append(capability.name)
 
-        result = self.text
+        return attributes
 
-        for attr in attributes:
-            method = getattr(terminal, attr)
-            result = method(result)
+    def escape(self, terminal: Terminal) -> Tuple[str, str]:
+        """
+        Returns the (start, reset) escape sequences of this style for the
+        given terminal.
+        """
+        key = (terminal.kind, terminal.does_styling)
+        sequences = self.sequences.get(key)
 
-        return result
+        if sequences is None:
+            if self.plain:
+                sequences = ('', '')
+            else:
+                sequences = (
+                    ''.join([str(getattr(terminal, attr)) for attr in self.attributes()]),
+                    str(terminal.normal),
+                )
+            self.sequences[key] = sequences
+
+        return sequences
+
+    def __reduce__(self):
+        return Style.of, (self.foreground, self.background, self.capabilities)
+
+    def __repr__(self):
+        return '<Style foreground={} background={} capabilities={}>'.format(
+            self.foreground,
+            self.background,
+            set(self.capabilities)
+        )
+
+
+class Fragment(object):
+    """
+    Immutable run of text in a single Style.  Fragments are shared freely
+    between lines, copying one returns the same fragment.
+    """
+    __slots__ = ('text', 'style', '_width')
+
+    def __init__(self,
+                 text: str,
+                 foreground: Optional[Color]=None,
+                 background: Optional[Color]=None,
+                 capabilities: Set[Capability]=None):
+        self.text: str = text
+        self.style: Style = Style.of(foreground, background, capabilities)
+        self._width: Optional[int] = None
+
+    @classmethod
+    def styled(cls, text: str, style: Style) -> 'Fragment':
+        fragment = cls.__new__(cls)
+        fragment.text = text
+        fragment.style = style
+        fragment._width = None
+        return fragment
+
+    @property
+    def foreground(self) -> Optional[Color]:
+        return self.style.foreground
+
+    @property
+    def background(self) -> Optional[Color]:
+        return self.style.background
+
+    @property
+    def capabilities(self) -> FrozenSet[Capability]:
+        return self.style.capabilities
+
+    def escape(self, terminal: Terminal) -> str:
+        start, reset = self.style.escape(terminal)
+        return start + self.text + reset
+
+    def __copy__(self):
+        return self
 
     def __len__(self):
-        return len(self.text)
+        if self._width is None:
+            self._width = text_width(self.text)
+        return self._width
 
     def __repr__(self):
         return '<Fragment "{}" foreground={} background={} capabilities={}>'.format(
             self.text,
             self.foreground,
             self.background,
-            self.capabilities
+            set(self.capabilities)
         )
 
     def __str__(self):
@@ -111,6 +430,8 @@ FragmentLike = Union[str, Fragment]
 
 
 class Line(object):
+    __slots__ = ('fragments',)
+
     def __init__(self,
                  root: FragmentLike,
                  *additional: FragmentLike,
@@ -137,19 +458,45 @@ class Line(object):
     def _fragment(cls, value: FragmentLike) -> Fragment:
         return value if isinstance(value, Fragment) else Fragment(value)
 
+    @classmethod
+    def of(cls, fragments: List[Fragment]) -> 'Line':
+        """
+        Builds a Line that takes ownership of the given list of fragments
+        without copying them.
+        """
+        line = cls.__new__(cls)
+        line.fragments = fragments
+        return line
+
+    @classmethod
+    def join(cls, lines: Iterable['Line']) -> 'Line':
+        """
+        Concatenates lines into one in a single pass, sharing their fragments.
+        """
+        fragments = list(chain.from_iterable(line.fragments for line in lines))
+        return cls.of(fragments or [Fragment('')])
+
+    # Fragments may be shared between lines, so styling replaces them
+
     def apply_capability(self, capability: Capability):
-        for fragment in self.fragments:
-            fragment.capabilities.add(capability)
+        self.fragments = [
+            Fragment.styled(fragment.text, fragment.style.with_capability(capability))
+            for fragment in self.fragments
+        ]
 
     def set_foreground_color(self, color: Color):
-        for fragment in self.fragments:
-            if fragment.foreground is None:
-                fragment.foreground = color
+        self.fragments = [
+            Fragment.styled(fragment.text, fragment.style.with_foreground(color))
+            if fragment.style.foreground is None else fragment
+            for fragment in self.fragments
+        ]
 
     def set_background_color(self, color: Color):
-        for fragment in self.fragments:
-            if fragment.background is None:
-                fragment.background = color
+        self.fragments = [
+            Fragment.styled(fragment.text, fragment.style.with_background(color))
+            if fragment.style.background is None else fragment
+            for fragment in self.fragments
+        ]
 
     def fit(self, length: int, indicator: str='…', expand: bool=True) -> 'Line':
         current_length = len(self)
@@ -162,24 +509,29 @@ class Line(object):
         return self.copy()
 
     def truncate(self, length: int, indicator: str='…') -> 'Line':
-        current_length = 0
-        fragments = self.fragments
-        result: List[Fragment] = []
+        if len(self) <= length:
+            # No need to truncate
+            return self.copy()
 
-        while current_length < length and fragments:
-            current = fragments.pop()
-            result.append(current)
-            current_length += len(current)
+        indicator_length = text_width(indicator)
+        if indicator_length > length:
+            indicator, indicator_length = '', 0
 
-        if current_length < length:
-            # No need to truncate
-            return Line(*result)
+        available = length - indicator_length
+        current_length = 0
+        result: List[Fragment] = []
 
-        remove = (current_length - length) + len(indicator)
+        for fragment in self.fragments:
+            if current_length + len(fragment) <= available:
+                result.append(fragment)
+                current_length += len(fragment)
+                continue
 
-        last = result.pop()
-        last.text = ''.join([last.text[:-remove], indicator])
-        result.append(last)
+            head = clip(fragment.text, available - current_length)
+            # A wide character that does not fit leaves a gap to fill
+            gap = ' ' * (available - current_length - text_width(head))
+            result.append(Fragment.styled(''.join([head, gap, indicator]), fragment.style))
+            break
 
         return Line(*result)
 
@@ -204,52 +556,91 @@ class Line(object):
                 last.text,
                 ' ' * (length - current_length)
             ])
-            result.append(Fragment(padded, last.foreground, last.background, last.capabilities))
+            result.append(Fragment.styled(padded, last.style))
         else:
             # Create a new Fragment with the appropriate padding
             result.append(Fragment(' ' * (length - current_length)))
 
         return Line(*result)
 
-    def wrap(self, width):
+    def wrap(self, width: int) -> List['Line']:
+        """
+        Breaks the line into rows of at most width cells, see wrap_words().
+        Fragments are split where a break falls inside them and shared
+        otherwise.
+        """
+        texts = [text.translate(WHITESPACE) for text in expand_tabs(fragment.text for fragment in self.fragments)]
         result = []
 
-        raw = str(self)
-        lines = wrap(raw, width)
-        fragments = list(reversed(self.fragments))
-        for line in lines:
-            length = len(line)
-            text_fragments: List[Fragment] = []
-            while length > 0 and fragments:
-                fragment = fragments.pop()
-                length -= len(fragment)
-                text_fragments.append(fragment)
-
-            if length < 0:
-                # Split is within the last fragment
-                last = text_fragments.pop()
-                head = Fragment(last.text[:length], last.foreground, last.background, last.capabilities)
-                tail = Fragment(last.text[length:].lstrip(), last.foreground, last.background, last.capabilities)
-                text_fragments.append(head)
-                fragments.append(tail)
-
-            result.append(Line(*text_fragments))
+        idx = offset = 0
+        for start, end in wrap_words(''.join(texts), width):
+            while offset + len(texts[idx]) <= start:
+                offset += len(texts[idx])
+                idx += 1
+
+            fragments = []
+            current, current_offset = idx, offset
+            while current < len(texts) and current_offset < end:
+                text = texts[current]
+                piece = text[max(0, start - current_offset):end - current_offset]
+                fragment = self.fragments[current]
+                if piece == fragment.text:
+                    fragments.append(fragment)
+                elif piece:
+                    fragments.append(Fragment.styled(piece, fragment.style))
+
+                current_offset += len(text)
+                current += 1
+
+            result.append(Line.of(fragments))
 
         return result
 
     def escape(self, terminal: Terminal) -> str:
-        return ''.join([fragment.escape(terminal) for fragment in self.fragments])
+        return Line.escape_lines([self], terminal)
+
+    @classmethod
+    def escape_lines(cls, lines: Iterable['Line'], terminal: Terminal, separator: str='\n') -> str:
+        """
+        Escapes lines as one block of output.  Runs of adjacent fragments
+        with the same style share one escape sequence and the style is only
+        switched where it changes, carrying over line breaks.
+        """
+        normal = str(terminal.normal)
+        plain = Style.of()
+        current = plain
+        output = []
+
+        for idx, line in enumerate(lines):
+            if idx:
+                output.append(separator)
+
+            for fragment in line.fragments:
+                if not fragment.text:
+                    continue
+
+                style = fragment.style
+                if style is not current:
+                    if current is not plain:
+                        output.append(normal)
+                    output.append(style.escape(terminal)[0])
+                    current = style
+
+                output.append(fragment.text)
+
+        if current is not plain:
+            output.append(normal)
+
+        return ''.join(output)
 
     def copy_fragments(self) -> List[Fragment]:
-        return [copy(f) for f in self.fragments]
+        return list(self.fragments)
 
     def copy(self) -> 'Line':
-        return Line(*self.copy_fragments())
+        return Line.of(self.copy_fragments())
 
     def __add__(self, other: 'Line') -> 'Line':
-        fragments = self.copy_fragments() + other.copy_fragments()
-        head, *tail = fragments
-        return Line(head, *tail)
+        return Line.of(self.fragments + other.fragments)
 
     def __len__(self):
         return sum(len(fragment) for fragment in self.fragments)
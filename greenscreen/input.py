@@ -1,3 +1,15 @@
+from concurrent.futures import Future
+from typing import Optional, Dict, Callable
+
+from blessed.keyboard import Keystroke
+
+# Bracketed paste, the terminal marks pasted text instead of typing it
+BRACKETED_PASTE_ON = '\x1b[?2004h'
+BRACKETED_PASTE_OFF = '\x1b[?2004l'
+PASTE_BEGIN = '\x1b[200~'
+PASTE_END = '\x1b[201~'
+
+
 class Result(object):
     def __init__(self):
         self.handled = None
@@ -39,3 +51,65 @@ class Async(Repaint):
         self.func = func
         self.args = args
         self.kwargs = kwargs
+        self.future: Optional[Future] = None
+
+
+class Paste(Keystroke):
+    """
+    Text pasted into the terminal, delivered at once as a single keystroke
+    named KEY_PASTE.  Line breaks are normalized to newlines.
+    """
+
+    def __new__(cls, text: str):
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return super().__new__(cls, text, name='KEY_PASTE')
+
+
+def binds(*keys: str):
+    """
+    Binds a method to one or more keys.  Keys are Keystroke names, like
+    KEY_LEFT, or plain characters.  The method is called with the Keystroke
+    and returns a Result.
+    """
+    def decorator(func):
+        func.bound_keys = getattr(func, 'bound_keys', ()) + keys
+        return func
+    return decorator
+
+
+def key_name(key: Keystroke) -> str:
+    return key.name or str(key)
+
+
+class Bindable(object):
+    """
+    Collects the methods of a class decorated with binds() into a key table
+    when the class is created, so looking up the handler of a key is a dict
+    lookup.  bind() adds or replaces bindings for a single instance.
+    """
+    key_bindings: Dict[str, str] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        key_bindings = {}
+        for klass in reversed(cls.__mro__):
+            for name, attr in vars(klass).items():
+                for key in getattr(attr, 'bound_keys', ()):
+                    key_bindings[key] = name
+        cls.key_bindings = key_bindings
+
+    def bind(self, key: str, handler: Callable[[Keystroke], Result]):
+        self.bindings[key] = handler
+
+    def binding(self, key: Keystroke) -> Optional[Callable[[Keystroke], Result]]:
+        name = key_name(key)
+        handler = self.bindings.get(name)
+        if handler is None and name in self.key_bindings:
+            handler = getattr(self, self.key_bindings[name])
+        return handler
+
+    def handlers(self) -> Dict[str, Callable[[Keystroke], Result]]:
+        result = {key: getattr(self, name) for key, name in self.key_bindings.items()}
+        result.update(self.bindings)
+        return result
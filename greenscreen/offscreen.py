@@ -0,0 +1,130 @@
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from greenscreen.components.base import Component
+from greenscreen.display.buffer import FrameBuffer
+from greenscreen.display.text import Line, Style
+from greenscreen.screen import Screen
+
+Target = Union[Screen, Component]
+Factory = Callable[[], Target]
+
+
+class Snapshot(object):
+    """
+    A frame rendered without a terminal, as a grid of plain cells.
+
+    Every cell holds a character and the index of its style in `palette`.
+    Cells are stored row by row in the flat `chars` and `styles` lists.  A
+    wide character is followed by a cell with an empty character.
+    """
+
+    def __init__(self, width: int, height: int, chars: List[str], styles: List[int], palette: List[Style]):
+        self.width = width
+        self.height = height
+        self.chars = chars
+        self.styles = styles
+        self.palette = palette
+
+    @classmethod
+    def rasterize(cls, lines: List[Line], width: int, height: int) -> 'Snapshot':
+        chars = []
+        styles = []
+        palette = []
+        ids: Dict[Style, int] = {}
+
+        for row_chars, row_styles in FrameBuffer.rasterize(lines, width, height):
+            for style in row_styles:
+                if style not in ids:
+                    ids[style] = len(palette)
+                    palette.append(style)
+                styles.append(ids[style])
+            chars.extend(row_chars)
+
+        return cls(width, height, chars, styles, palette)
+
+    def cell(self, x: int, y: int) -> Tuple[str, Style]:
+        idx = y * self.width + x
+        return self.chars[idx], self.palette[self.styles[idx]]
+
+    def rows(self) -> List[str]:
+        return [
+            ''.join(self.chars[y * self.width:(y + 1) * self.width])
+            for y in range(self.height)
+        ]
+
+    def text(self) -> str:
+        return '\n'.join(self.rows())
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Snapshot) and
+            (self.width, self.height, self.chars) == (other.width, other.height, other.chars) and
+            [self.palette[idx] for idx in self.styles] == [other.palette[idx] for idx in other.styles]
+        )
+
+    def __repr__(self):
+        return '<Snapshot {}x{} styles={}>'.format(self.width, self.height, len(self.palette))
+
+
+def render(target: Target, width: int, height: int) -> Snapshot:
+    """
+    Renders a Screen or Component at any size without a terminal.
+    """
+    if isinstance(target, Screen):
+        lines = target.frame(width, height)
+    else:
+        lines = target.render(width, height)
+
+    return Snapshot.rasterize(lines, width, height)
+
+
+def render_sizes(factory: Factory, sizes: List[Tuple[int, int]]) -> List[Snapshot]:
+    target = factory()
+    return [render(target, width, height) for width, height in sizes]
+
+
+def render_batch(jobs: Iterable[Tuple[Factory, int, int]],
+                 executor: Executor=None,
+                 chunk: Optional[int]=None) -> List[Snapshot]:
+    """
+    Renders (factory, width, height) jobs in parallel, by default across a
+    process pool, and returns the snapshots in the order of the jobs.
+
+    Each factory builds the Screen or Component to render.  The sizes
+    requested for a factory are split into chunks of at most `chunk` sizes,
+    by default spreading all jobs evenly over the workers, so even a single
+    target at many sizes is rendered in parallel.  The factory is called
+    once per chunk and its target rendered at every size in it, so
+    factories must be picklable, like module level functions.
+    """
+    groups: Dict[Factory, List[Tuple[int, int]]] = {}
+    order = []
+    for factory, width, height in jobs:
+        sizes = groups.setdefault(factory, [])
+        order.append((factory, len(sizes)))
+        sizes.append((width, height))
+
+    owned = executor is None
+    executor = executor or ProcessPoolExecutor()
+    workers = getattr(executor, '_max_workers', None) or os.cpu_count() or 1
+    chunk = chunk or max(1, -(-len(order) // workers))
+
+    try:
+        futures = {
+            factory: [
+                executor.submit(render_sizes, factory, sizes[start:start + chunk])
+                for start in range(0, len(sizes), chunk)
+            ]
+            for factory, sizes in groups.items()
+        }
+        results = {
+            factory: [snapshot for future in chunks for snapshot in future.result()]
+            for factory, chunks in futures.items()
+        }
+    finally:
+        if owned:
+            executor.shutdown()
+
+    return [results[factory][idx] for factory, idx in order]
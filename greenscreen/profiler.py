@@ -0,0 +1,147 @@
+from collections import defaultdict, deque
+from itertools import count
+from time import perf_counter
+from weakref import WeakKeyDictionary
+from typing import Callable, Dict, List, Deque, Tuple, Optional
+
+from greenscreen.display.text import Line, Fragment, Capabilities
+
+
+class Sample(object):
+    def __init__(self, label: str):
+        self.label = label
+        self.calls = 0
+        self.elapsed = 0.0
+        self.lines = 0
+        self.fragments = 0
+
+    def add(self, elapsed: float, lines: List[Line]):
+        self.calls += 1
+        self.elapsed += elapsed
+        self.lines += len(lines)
+        self.fragments += sum(len(line.fragments) for line in lines)
+
+    def __repr__(self):
+        return '<Sample {} calls={} elapsed={:.6f} lines={} fragments={}>'.format(
+            self.label,
+            self.calls,
+            self.elapsed,
+            self.lines,
+            self.fragments
+        )
+
+
+class Profiler(object):
+    """
+    Records the wall time, line and fragment counts of every render() and
+    content() call per component, aggregated per frame.
+
+    Install it with Application.profile().  The samples of the last
+    `history` frames are kept for the overlay, the time spent in every stack
+    of calls is accumulated over all frames and can be written with dump()
+    in the collapsed format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, history: int=60, slowest: int=5, overlay: bool=True):
+        self.history = history
+        self.slowest = slowest
+        self.overlay = overlay
+        self.stack: List[List] = []
+        self.samples: Dict[str, Sample] = {}
+        self.started: Optional[float] = None
+        self.frames: Deque[Tuple[float, float, Dict[str, Sample]]] = deque(maxlen=history)
+        self.folded: Dict[str, float] = defaultdict(float)
+        self.labels = WeakKeyDictionary()
+        self.numbers: Dict[str, count] = defaultdict(lambda: count(1))
+
+    def label(self, component) -> str:
+        # Components are numbered per class in the order they are first seen
+        label = self.labels.get(component)
+        if label is None:
+            name = component.__class__.__name__
+            label = self.labels[component] = '{}#{}'.format(name, next(self.numbers[name]))
+        return label
+
+    def begin_frame(self):
+        self.samples = {}
+        self.started = perf_counter()
+
+    def end_frame(self):
+        finished = perf_counter()
+        self.frames.append((finished, finished - self.started, self.samples))
+
+    def measure(self, component, phase: str, func: Callable[..., List[Line]], *args) -> List[Line]:
+        label = '{}.{}'.format(self.label(component), phase)
+        entry = [label, 0.0]
+        self.stack.append(entry)
+
+        start = perf_counter()
+        try:
+            lines = func(*args)
+        finally:
+            elapsed = perf_counter() - start
+            path = ';'.join(item[0] for item in self.stack)
+            self.stack.pop()
+
+        self.folded[path] += elapsed - entry[1]
+        if self.stack:
+            self.stack[-1][1] += elapsed
+
+        if label not in self.samples:
+            self.samples[label] = Sample(label)
+        self.samples[label].add(elapsed, lines)
+
+        return lines
+
+    @property
+    def frame_time(self) -> float:
+        if not self.frames:
+            return 0.0
+        return sum(frame[1] for frame in self.frames) / len(self.frames)
+
+    @property
+    def fps(self) -> float:
+        if len(self.frames) < 2:
+            return 0.0
+        span = self.frames[-1][0] - self.frames[0][0]
+        return (len(self.frames) - 1) / span if span else 0.0
+
+    def slowest_samples(self) -> List[Sample]:
+        if not self.frames:
+            return []
+        samples = self.frames[-1][2].values()
+        return sorted(samples, key=lambda sample: sample.elapsed, reverse=True)[:self.slowest]
+
+    def report(self) -> List[str]:
+        rows = ['frame {:.2f}ms  {:.1f} fps'.format(self.frame_time * 1000, self.fps)]
+        for sample in self.slowest_samples():
+            rows.append('{:.2f}ms x{} {}L {}F {}'.format(
+                sample.elapsed * 1000,
+                sample.calls,
+                sample.lines,
+                sample.fragments,
+                sample.label
+            ))
+        return rows
+
+    def draw(self, lines: List[Line], width: int) -> List[Line]:
+        """
+        Draws the report over the top right corner of the given lines.
+        """
+        rows = self.report()
+        overlay_width = min(width, max(len(row) for row in rows) + 2)
+
+        result = list(lines)
+        for idx, row in enumerate(rows[:len(result)]):
+            fragment = Fragment(' {} '.format(row), capabilities={Capabilities.REVERSE})
+            result[idx] = (
+                result[idx].fit(width - overlay_width, indicator='') +
+                Line(fragment).fit(overlay_width, indicator='')
+            )
+
+        return result
+
+    def dump(self, path: str):
+        with open(path, 'w') as output:
+            for stack, elapsed in sorted(self.folded.items()):
+                output.write('{} {}\n'.format(stack, int(elapsed * 1000000)))
@@ -1,22 +1,44 @@
+from collections import defaultdict
+from typing import List, Dict, Callable, Optional, Tuple
+
 from blessed import Terminal
 from blessed.keyboard import Keystroke
 
 from greenscreen.components.base import Component
-from greenscreen.input import Result, Unhandled
+from greenscreen.display.text import Line
+from greenscreen.input import Result, Unhandled, Async, Repaint, Bindable, key_name
+
+
+KeyMap = Dict[str, List[Callable[[Keystroke], Result]]]
 
 
-class Screen(object):
+class Screen(Bindable):
     def __init__(self, key, parent, root: Component):
         self.key = key
         self.parent = parent
         self.parent.register_screen(key, self)
         self.root = root
+        self.bindings = {}
+        self.compiled: Optional[Tuple[Component, int, Optional[KeyMap]]] = None
 
-    def render(self, terminal: Terminal) -> str:
-        raise NotImplementedError('{cls} has not implemented render()'.format(
+    def frame(self, width: int, height: int) -> List[Line]:
+        raise NotImplementedError('{cls} has not implemented frame()'.format(
             cls=self.__class__.__name__
         ))
 
+    def render(self, terminal: Terminal) -> str:
+        return Line.escape_lines(self.frame(terminal.width, terminal.height - 1), terminal)
+
+    @property
+    def legacy(self) -> bool:
+        """
+        Whether the screen only overrides render(), which subclasses used to
+        implement before frame().  Such screens are still painted, but as
+        whole frames their own way, without diffing against the last one.
+        """
+        cls = self.__class__
+        return cls.frame is Screen.frame and cls.render is not Screen.render
+
     def handle_keypress(self, key: Keystroke) -> Result:
         result = self.keypress(key)
         if result.handled:
@@ -31,16 +53,61 @@ class Screen(object):
     def keypress(self, key: Keystroke) -> Result:
         return Unhandled()
 
+    def focus_path(self) -> List[Component]:
+        path = []
+        component = self.root
+        while component is not None:
+            path.append(component)
+            component = component.focused
+        return path
+
+    def keymap(self) -> Optional[KeyMap]:
+        """
+        Compiles the key bindings along the focus path into a single map from
+        key to handlers, deepest component first, the order in which
+        handle_keypress would reach them.  The map is cached until the focus
+        path changes.  If a component on the path overrides the keypress
+        methods its behaviour can't be compiled and None is returned.
+        """
+        version = self.root.focus_version
+        if self.compiled is not None and self.compiled[:2] == (self.root, version):
+            return self.compiled[2]
+
+        path = self.focus_path()
+        keymap = None
+
+        if all(type(component).compilable() for component in path):
+            keymap = defaultdict(list)
+            for component in reversed(path):
+                for name, handler in component.handlers().items():
+                    keymap[name].append(handler)
+
+        self.compiled = (self.root, version, keymap)
+        return keymap
+
     def dispatch_keypress(self, key: Keystroke) -> Result:
-        return self.root.handle_keypress(key)
+        keymap = self.keymap()
+        if keymap is None:
+            return self.root.handle_keypress(key)
+
+        for handler in keymap.get(key_name(key), ()):
+            result = handler(key)
+            if result.handled:
+                return result
+
+        return Unhandled()
 
     def after_keypress(self, key: Keystroke) -> Result:
+        handler = self.binding(key)
+        return handler(key) if handler is not None else Unhandled()
+
+    def handle_async(self, job: Async, value) -> Result:
+        return Repaint(self)
+
+    def handle_error(self, job: Async, error: BaseException) -> Result:
         return Unhandled()
 
 
 class SimpleScreen(Screen):
-    def render(self, terminal: Terminal) -> str:
-        return '\n'.join([
-            line.escape(terminal)
-            for line in self.root.render(terminal.width, terminal.height - 1)
-        ])
+    def frame(self, width: int, height: int) -> List[Line]:
+        return self.root.render(width, height)
@@ -0,0 +1,246 @@
+import asyncio
+import codecs
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Optional, Set, Tuple
+
+from greenscreen.application import Application
+from greenscreen.input import BRACKETED_PASTE_ON, BRACKETED_PASTE_OFF
+from greenscreen.terminal import VirtualTerminal
+
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+ECHO = 1
+SGA = 3
+NAWS = 31
+
+logger = logging.getLogger(__name__)
+
+
+class TelnetDecoder(object):
+    """
+    Strips telnet commands from a byte stream and reports the window size
+    negotiated with NAWS.  Incomplete commands are kept until the next chunk.
+    """
+
+    def __init__(self):
+        self.pending = b''
+
+    @classmethod
+    def negotiation(cls) -> bytes:
+        # Character at a time mode without local echo, and report window size
+        return bytes([IAC, WILL, ECHO, IAC, WILL, SGA, IAC, DO, NAWS])
+
+    def decode(self, data: bytes) -> Tuple[bytes, Optional[Tuple[int, int]]]:
+        data = self.pending + data
+        self.pending = b''
+        payload = bytearray()
+        size = None
+
+        idx = 0
+        while idx < len(data):
+            if data[idx] != IAC:
+                payload.append(data[idx])
+                idx += 1
+                continue
+
+            if idx + 1 >= len(data):
+                self.pending = data[idx:]
+                break
+
+            command = data[idx + 1]
+            if command == IAC:
+                payload.append(IAC)
+                idx += 2
+            elif command in (DO, DONT, WILL, WONT):
+                if idx + 2 >= len(data):
+                    self.pending = data[idx:]
+                    break
+                idx += 3
+            elif command == SB:
+                end = data.find(bytes([IAC, SE]), idx)
+                if end == -1:
+                    self.pending = data[idx:]
+                    break
+
+                body = data[idx + 2:end]
+                if len(body) >= 5 and body[0] == NAWS:
+                    size = (body[1] * 256 + body[2], body[3] * 256 + body[4])
+                idx = end + 2
+            else:
+                idx += 2
+
+        return bytes(payload), size
+
+
+class SessionStream(object):
+    """
+    Text stream a session's Terminal writes its frames to.
+
+    While more than `limit` bytes wait to be sent to a client that doesn't
+    keep up, writes are dropped instead of buffered without bound.  Once the
+    client has caught up, `resume` is called to repaint the whole screen.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, limit: int, resume: Callable[[], None]):
+        self.writer = writer
+        self.limit = limit
+        self.resume = resume
+        self.draining: Optional[asyncio.Future] = None
+        writer.transport.set_write_buffer_limits(high=limit)
+
+    @property
+    def stalled(self) -> bool:
+        return self.writer.transport.get_write_buffer_size() > self.limit
+
+    def write(self, text: str):
+        if self.writer.is_closing() or self.draining is not None:
+            return
+
+        if self.stalled:
+            self.draining = asyncio.ensure_future(self.drain())
+            return
+
+        self.writer.write(text.encode('utf-8'))
+
+    async def drain(self):
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            return
+        self.draining = None
+        self.resume()
+
+    def flush(self):
+        pass
+
+
+class Session(object):
+    """
+    One connection served by a Server, with its own Application and a
+    VirtualTerminal writing to the connection.
+    """
+
+    def __init__(self, server: 'Server', reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.stream = SessionStream(writer, server.limit, self.resume)
+        self.terminal = VirtualTerminal(server.width, server.height, stream=self.stream)
+        self.app = Application(executor=server.executor, terminal=self.terminal)
+        self.telnet = TelnetDecoder() if server.telnet else None
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        server.build(self.app)
+
+    async def run(self):
+        if self.telnet is not None:
+            self.writer.write(TelnetDecoder.negotiation())
+
+        self.stream.write(
+            str(self.terminal.enter_fullscreen) +
+            str(self.terminal.hide_cursor) +
+            BRACKETED_PASTE_ON
+        )
+        reading = asyncio.ensure_future(self.read())
+
+        try:
+            await self.app.main_loop()
+        finally:
+            reading.cancel()
+            if self.stream.draining is not None:
+                self.stream.draining.cancel()
+            self.stream.write(
+                BRACKETED_PASTE_OFF +
+                str(self.terminal.normal) +
+                str(self.terminal.normal_cursor) +
+                str(self.terminal.exit_fullscreen)
+            )
+            self.writer.close()
+
+    def resume(self):
+        # Frames were dropped, so the client's screen is out of date
+        self.app.buffer.invalidate()
+        self.app.request_repaint()
+
+    async def read(self):
+        try:
+            while True:
+                data = await self.reader.read(4096)
+                if not data:
+                    return
+
+                if self.telnet is not None:
+                    data, size = self.telnet.decode(data)
+                    if size is not None and all(size):
+                        self.terminal.resize(*size)
+                        self.app.request_repaint()
+
+                text = self.decoder.decode(data)
+                if text:
+                    self.app.feed(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception('Failed handling input, closing the session')
+        finally:
+            # Without input the session can't go on
+            self.app.active = False
+            self.app.wake()
+
+
+class Server(object):
+    """
+    Serves an independent Application to every connection on a TCP or UNIX
+    socket, all multiplexed on one asyncio event loop.
+
+    `build` is called with every new session's Application to register its
+    screens and select the active one.  Sessions share the executor for
+    Async jobs as well as interned styles and their escape sequences.
+
+    Every session buffers at most `limit` bytes of output for a client
+    that doesn't keep up, further frames are dropped until it has caught
+    up.
+
+    With `telnet` set, as for `telnet host port`, the client is switched to
+    character mode and its window size is negotiated.  Otherwise the client
+    has to send raw keystrokes itself, like `socat -,raw,echo=0 UNIX:path`,
+    and sessions use the default size.
+    """
+
+    def __init__(self,
+                 build: Callable[[Application], None],
+                 width: int=80,
+                 height: int=24,
+                 telnet: bool=True,
+                 executor: Executor=None,
+                 limit: int=65536):
+        self.build = build
+        self.width = width
+        self.height = height
+        self.telnet = telnet
+        self.limit = limit
+        self.executor = executor or ThreadPoolExecutor(max_workers=8)
+        self.sessions: Set[Session] = set()
+
+    async def connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = Session(self, reader, writer)
+        self.sessions.add(session)
+        try:
+            await session.run()
+        finally:
+            self.sessions.discard(session)
+
+    async def serve_tcp(self, host: str='127.0.0.1', port: int=8023) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.connect, host, port)
+
+    async def serve_unix(self, path: str) -> asyncio.AbstractServer:
+        return await asyncio.start_unix_server(self.connect, path)
+
+    async def serve_forever(self, server: asyncio.AbstractServer):
+        async with server:
+            await server.serve_forever()
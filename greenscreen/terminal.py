@@ -0,0 +1,56 @@
+import io
+from typing import TextIO, Dict, Tuple
+
+from blessed import Terminal
+
+
+class VirtualTerminal(Terminal):
+    """
+    A Terminal of a fixed size that writes to any stream instead of a tty.
+
+    Styling is always enabled so the escape sequences are the ones a real
+    terminal of the same kind would receive.
+
+    Terminals of the same kind build identical capability and keymap
+    tables and resolve identical sequences.  VirtualTerminals share one
+    copy of those per kind, which keeps many of them, one per served
+    session, cheap.
+    """
+    tables: Dict[str, Dict[str, object]] = {}
+    shared: Tuple[str, ...] = (
+        'caps',
+        'caps_compiled',
+        '_caps_compiled_any',
+        '_caps_unnamed_any',
+        '_keycodes',
+        '_keymap',
+        '_keymap_prefixes',
+    )
+
+    def __init__(self,
+                 width: int=80,
+                 height: int=24,
+                 stream: TextIO=None,
+                 kind: str='xterm-256color'):
+        super().__init__(kind=kind, stream=stream or io.StringIO(), force_styling=True)
+        self.size = (width, height)
+
+        self.share()
+
+    def share(self):
+        tables = self.tables.setdefault(self.kind, {})
+        for name, value in list(vars(self).items()):
+            # Resolved sequences are cached on the instance as str subclasses
+            if name in self.shared or isinstance(value, str):
+                setattr(self, name, tables.setdefault(name, value))
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    def resize(self, width: int, height: int):
+        self.size = (width, height)
@@ -0,0 +1,52 @@
+import io
+import textwrap
+
+from greenscreen.components.text import StreamText
+from greenscreen.display.text import Line, Fragment, text_width, wrap_text
+
+
+def test_stream_text_newline_terminated_lines():
+    text = StreamText(retention=4)
+    text.feed(io.StringIO('one\ntwo\nthree\n'))
+    assert list(text.lines) == ['one', 'two', 'three']
+
+    text.feed(io.StringIO('four\nfive\n'))
+    assert list(text.lines) == ['two', 'three', 'four', 'five']
+
+
+def test_stream_text_split_chunks():
+    text = StreamText()
+    text.append('partial li')
+    text.render(20, 3)
+    text.append('ne done\nnext')
+    assert list(text.lines) == ['partial line done', 'next']
+    assert text.count == 2
+
+    text.append('\n\n')
+    assert list(text.lines) == ['partial line done', 'next', '']
+    assert [str(line).strip() for line in text.render(20, 3)] == ['partial line done', 'next', '']
+
+
+def test_wrap_text_matches_textwrap_on_ascii():
+    samples = [
+        'a self-contained long-running service',
+        'tabs\tbetween\twords and\tafter-hyphens-too',
+        '\tindented by a tab, then an extraordinarily-long-hyphenated-word',
+        'em--dashes and trailing- hyphens - alone',
+        'lines\nwith\nbreaks and   runs of   spaces',
+    ]
+    for text in samples:
+        for width in range(1, 45):
+            assert wrap_text(text, width) == textwrap.wrap(text, width), (text, width)
+
+
+def test_wrap_text_measures_cells():
+    text = '日本語のテキストはとても長いのでここで折り返す必要があります'
+    rows = wrap_text(text, 20)
+    assert ''.join(rows) == text
+    assert [text_width(row) for row in rows] == [20, 20, 20]
+
+
+def test_line_wrap_expands_tabs_across_fragments():
+    line = Line(Fragment('a\tb'), Fragment('c\td'))
+    assert [str(row) for row in line.wrap(40)] == textwrap.wrap('a\tbc\td', 40)